@@ -0,0 +1,284 @@
+"""Closed-loop HTTP load test for /chat, /studyplan and /analyze-audio.
+
+For each endpoint and each ``--concurrency`` level, ``--requests`` requests
+are sent by that many worker threads, each sending its next request as soon
+as the previous one returns. Reported per level:
+- throughput
+- latency p50, p90, p99 and max
+- error count and status codes
+- the ``source`` field of the replies (ai, cache, fallback, ...)
+
+``--spawn`` starts both services on the ports of ``--chat-url`` and
+``--voice-url`` with ``LLM_BACKEND=stub`` and stops them afterwards, so the
+run needs neither a Gemini key nor network. The stub is configured through
+the usual ``LLM_STUB_*`` variables (latency distribution, error rate,
+invalid-plan rate, seed). ``/analyze-audio`` still runs Whisper and the
+emotion model locally, so their weights must already be downloaded.
+
+Every audio request carries a slightly different clip (one sample nudged),
+so the voice service's analysis cache does not turn the run into cache hits.
+``--repeat-audio`` sends identical clips instead, to measure the cached path.
+
+Usage:
+    python benchmarks/load_test.py --spawn [--endpoints chat,studyplan,analyze-audio]
+        [--concurrency 1,4,16] [--requests 100] [--json load_report.json]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import wave
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+AI_MODELS_ROOT = Path(__file__).resolve().parents[1]
+TESTING_DATA = AI_MODELS_ROOT / "voice_model" / "testing_data"
+ENDPOINTS = ("chat", "studyplan", "analyze-audio")
+
+CHAT_MESSAGES = (
+    "hi",
+    "I feel anxious",
+    "I'm so stressed about exams",
+    "I couldn't sleep last night and my mind keeps racing about tomorrow.",
+    "My friends didn't invite me and I feel left out.",
+    "hello",
+    "I feel really tired all the time lately",
+    "How do I stop overthinking before a presentation?",
+)
+
+STUDYPLAN_BODY = {
+    "subjects": ["Mathematics", "Physics", {"name": "Chemistry"}],
+    "availability": {"daily_start": "09:00", "daily_end": "21:00", "days": 3, "max_hours_per_day": 6},
+    "exams": [],
+}
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank.
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _nudged_wav(audio: bytes, n: int) -> bytes:
+    """``audio`` with its first sample changed by ``n``, so every clip hashes differently."""
+    with wave.open(io.BytesIO(audio)) as source:
+        params = source.getparams()
+        frames = bytearray(source.readframes(source.getnframes()))
+    if params.sampwidth == 2 and len(frames) >= 2:
+        value = int.from_bytes(frames[:2], "little", signed=True)
+        value = max(-32768, min(32767, value + (n % 64) - 32))
+        frames[:2] = value.to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as target:
+        target.setparams(params)
+        target.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def _json_request(url: str, payload: dict) -> urllib.request.Request:
+    return urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+    )
+
+
+def build_requests(args: argparse.Namespace) -> dict[str, Callable[[int], urllib.request.Request]]:
+    """Request factory per endpoint; the argument is the request number."""
+    chat_url, voice_url = args.chat_url.rstrip("/"), args.voice_url.rstrip("/")
+    clips = [path.read_bytes() for path in sorted(TESTING_DATA.glob("*.wav"))]
+
+    def chat(n: int) -> urllib.request.Request:
+        return _json_request(
+            f"{chat_url}/chat",
+            {"message": CHAT_MESSAGES[n % len(CHAT_MESSAGES)], "session_id": f"load-{n % args.sessions}"}
+            if args.sessions else {"message": CHAT_MESSAGES[n % len(CHAT_MESSAGES)]},
+        )
+
+    def studyplan(n: int) -> urllib.request.Request:
+        return _json_request(f"{chat_url}/studyplan", STUDYPLAN_BODY)
+
+    def analyze_audio(n: int) -> urllib.request.Request:
+        if not clips:
+            raise SystemExit(f"No WAV files found in {TESTING_DATA}")
+        audio = clips[n % len(clips)]
+        if not args.repeat_audio:
+            audio = _nudged_wav(audio, n)
+        return urllib.request.Request(
+            f"{voice_url}/analyze-audio", data=audio, headers={"Content-Type": "audio/wav"}, method="POST"
+        )
+
+    return {"chat": chat, "studyplan": studyplan, "analyze-audio": analyze_audio}
+
+
+def _send(request: urllib.request.Request, timeout_s: float) -> tuple[float, str, Optional[str]]:
+    """``(seconds, status, source)`` for one request; network errors have status "error:<type>"."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout_s) as response:
+            body, status = response.read(), str(response.status)
+    except urllib.error.HTTPError as exc:
+        body, status = exc.read(), str(exc.code)
+    except (urllib.error.URLError, OSError) as exc:
+        return time.perf_counter() - start, f"error:{type(exc).__name__}", None
+    elapsed = time.perf_counter() - start
+    try:
+        payload = json.loads(body)
+        source = payload.get("source") if isinstance(payload, dict) else None
+        if source is None and isinstance(payload, dict) and "ok" in payload:
+            source = "plan_ok" if payload.get("ok") else "plan_error"
+    except ValueError:
+        source = None
+    return elapsed, status, source
+
+
+def run_level(factory: Callable[[int], urllib.request.Request], level: int, total: int, timeout_s: float) -> dict:
+    counter = iter(range(total))
+    lock = threading.Lock()
+    results: list[tuple[float, str, Optional[str]]] = []
+
+    def worker() -> None:
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            result = _send(factory(n), timeout_s)
+            with lock:
+                results.append(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=level) as executor:
+        for _ in range(level):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, status, _ in results if not status.startswith("error"))
+    statuses = Counter(status for _, status, _ in results)
+    return {
+        "requests": len(results),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms_p50": round(_percentile(latencies, 50), 1),
+        "latency_ms_p90": round(_percentile(latencies, 90), 1),
+        "latency_ms_p99": round(_percentile(latencies, 99), 1),
+        "latency_ms_max": round(latencies[-1], 1) if latencies else 0.0,
+        "statuses": dict(statuses),
+        "sources": dict(Counter(source for _, _, source in results if source)),
+    }
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited with code {process.returncode} during startup")
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    raise SystemExit(f"{url} did not become healthy within {timeout_s:.0f}s")
+
+
+def spawn_services(args: argparse.Namespace, endpoints: list[str]) -> list[subprocess.Popen]:
+    env = {**os.environ, "LLM_BACKEND": "stub"}
+    services = []
+    if {"chat", "studyplan"} & set(endpoints):
+        env_chat = {**env, "FLASK_PORT": str(urlparse(args.chat_url).port or 5001)}
+        services.append((args.chat_url, AI_MODELS_ROOT / "chatbot", ["app.py"], env_chat))
+    if "analyze-audio" in endpoints:
+        env_voice = {**env, "FLASK_VOICE_PORT": str(urlparse(args.voice_url).port or 5002)}
+        services.append((args.voice_url, AI_MODELS_ROOT / "voice_model", ["app/api.py"], env_voice))
+
+    processes = []
+    try:
+        for url, cwd, script, service_env in services:
+            process = subprocess.Popen([sys.executable, *script], cwd=cwd, env=service_env)
+            processes.append(process)
+            _wait_healthy(url.rstrip("/"), process, args.startup_timeout)
+    except BaseException:
+        stop_services(processes)
+        raise
+    return processes
+
+
+def stop_services(processes: list[subprocess.Popen]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test for the chatbot and voice services")
+    parser.add_argument("--chat-url", default="http://localhost:5001")
+    parser.add_argument("--voice-url", default="http://localhost:5002")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and level")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--sessions", type=int, default=0, help="Spread chats over this many session ids")
+    parser.add_argument("--repeat-audio", action="store_true", help="Send identical clips (cache hits)")
+    parser.add_argument("--spawn", action="store_true", help="Start the services with LLM_BACKEND=stub")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    processes = spawn_services(args, endpoints) if args.spawn else []
+    try:
+        factories = build_requests(args)
+        report: dict[str, dict] = {}
+        print(f"{'endpoint':<15}{'conc':>5}{'req/s':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'errors':>8}  sources")
+        for endpoint in endpoints:
+            report[endpoint] = {}
+            for level in levels:
+                data = run_level(factories[endpoint], level, args.requests, args.timeout)
+                report[endpoint][str(level)] = data
+                sources = ", ".join(f"{name}={count}" for name, count in sorted(data["sources"].items()))
+                print(
+                    f"{endpoint:<15}{level:>5}{data['throughput_rps']:>9.1f}{data['latency_ms_p50']:>7.0f}ms"
+                    f"{data['latency_ms_p90']:>7.0f}ms{data['latency_ms_p99']:>7.0f}ms{data['errors']:>8}  {sources}"
+                )
+    finally:
+        stop_services(processes)
+
+    if args.json:
+        output = {
+            "config": {
+                "requests": args.requests,
+                "concurrency": levels,
+                "spawned": args.spawn,
+                "repeat_audio": args.repeat_audio,
+                "sessions": args.sessions,
+                "llm": {k: v for k, v in os.environ.items() if k == "LLM_BACKEND" or k.startswith("LLM_STUB_")},
+            },
+            "endpoints": report,
+        }
+        Path(args.json).write_text(json.dumps(output, indent=2) + "\n", encoding="utf-8")
+        print(f"report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
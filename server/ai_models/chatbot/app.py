@@ -1,12 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+import json
 import google.generativeai as genai
 import os
 import sys
 import codecs
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 from flask_cors import CORS
 
+# ai_models/ holds shared/ (code common to the chatbot and voice services).
+_AI_MODELS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _AI_MODELS_ROOT not in sys.path:
+    sys.path.insert(0, _AI_MODELS_ROOT)
+
+from shared.llm_guard import CircuitBreaker, CircuitOpenError, GuardedLLM
+from shared.llm_backend import llm_backend, shared_stub
+from shared.metrics import REPLY_CACHE_SAVED_SECONDS, RESPONSE_SOURCES, STAGE_SECONDS, instrument_flask
+from conversation_store import ConversationStore
+from reply_cache import ReplyCache, load_risk_phrases
 from studyplanner import (
     generate_plan,
     extract_exams_from_image,
@@ -23,8 +35,15 @@ if sys.platform == "win32":
 env_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
 load_dotenv(dotenv_path=env_path)
 api_key = os.getenv("GEMINI_API_KEY")
+# "gemini" (default) or "stub" for the offline model (see shared.llm_stub).
+LLM_BACKEND = llm_backend()
+# Per-call timeout for chat completions, in seconds.
+LLM_TIMEOUT_S = float(os.getenv("CHATBOT_LLM_TIMEOUT", "20"))
 
-if not api_key:
+if LLM_BACKEND == "stub":
+    model = shared_stub()
+    print(" Using the offline stub model (LLM_BACKEND=stub).")
+elif not api_key:
     print("GEMINI_API_KEY not found — running in fallback mode.")
     model = None
 else:
@@ -37,14 +56,62 @@ else:
         print(f"Error initializing Gemini model: {e}")
         model = None
 
+# Every chat call goes through one breaker: after CHATBOT_BREAKER_FAILURES
+# failed or slow calls in a row, replies fall back at once until a probe
+# succeeds. LLM_HEDGE_AFTER_S (off by default) sends one duplicate request
+# for calls that have not answered by then.
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "0")) or None
+llm_breaker = CircuitBreaker(
+    "chatbot",
+    failure_threshold=int(os.getenv("CHATBOT_BREAKER_FAILURES", "5")),
+    reset_timeout_s=float(os.getenv("CHATBOT_BREAKER_RESET_S", "30")),
+    slow_call_s=float(os.getenv("CHATBOT_SLOW_CALL_S", "8")) or None,
+)
+guarded_model = GuardedLLM(
+    model,
+    llm_breaker,
+    timeout_s=LLM_TIMEOUT_S,
+    hedge_after_s=LLM_HEDGE_AFTER_S,
+    observe=lambda seconds: STAGE_SECONDS.observe(seconds, service="chatbot", stage="gemini"),
+) if model else None
+
+# Short openers ("hi", "I feel anxious") are answered from pools of earlier
+# model replies. Messages with a risk-lexicon phrase always reach the model.
+RISK_LEXICON_PATH = os.getenv(
+    "CHATBOT_RISK_LEXICON",
+    os.path.join(_AI_MODELS_ROOT, "voice_model", "services", "data", "risk_lexicon.json"),
+)
+reply_cache = ReplyCache(
+    load_risk_phrases(RISK_LEXICON_PATH),
+    max_entries=int(os.getenv("CHATBOT_REPLY_CACHE_SIZE", "512")),
+    ttl_s=float(os.getenv("CHATBOT_REPLY_CACHE_TTL", str(6 * 3600))),
+    pool_size=int(os.getenv("CHATBOT_REPLY_CACHE_POOL", "3")),
+    threshold=float(os.getenv("CHATBOT_REPLY_CACHE_THRESHOLD", "0.85")),
+    match=os.getenv("CHATBOT_REPLY_CACHE_MATCH", "exact"),
+    max_chars=int(os.getenv("CHATBOT_REPLY_CACHE_MAX_CHARS", "80")),
+    fuzzy_max_chars=int(os.getenv("CHATBOT_REPLY_CACHE_FUZZY_MAX_CHARS", "24")),
+) if os.getenv("CHATBOT_REPLY_CACHE", "1") != "0" else None
+
+# Per-session memory: requests that carry a session_id get their recent turns
+# in the prompt, newest first, up to CHATBOT_HISTORY_TOKENS.
+HISTORY_TOKENS = int(os.getenv("CHATBOT_HISTORY_TOKENS", "1024"))
+conversations = ConversationStore(
+    max_turns=int(os.getenv("CHATBOT_SESSION_TURNS", "20")),
+    idle_ttl_s=float(os.getenv("CHATBOT_SESSION_IDLE_TTL", "1800")),
+    max_sessions=int(os.getenv("CHATBOT_MAX_SESSIONS", "10000")),
+    db_path=os.getenv("CHATBOT_SESSION_DB") or None,
+)
+
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app, origins=[
+CORS_ORIGINS = [
     "http://localhost:3000", 
     "http://localhost:8081", 
     "http://localhost:19006", 
     "http://localhost:5000"
-])
+]
+CORS(app, origins=CORS_ORIGINS)
+instrument_flask(app, "chatbot")
 
 SYSTEM_PROMPT = """
 You are MindMate++, a warm, empathetic, and encouraging mental wellness friend.
@@ -52,10 +119,118 @@ keep the answers short and convesational.
 Also keep in mind you are interacting to a person living in India.
 """
 
+ERROR_REPLY = "I'm here with you. I’m having a small hiccup right now, but I’m listening."
+
+
+def build_chat_prompt(user_message, history=""):
+    if history:
+        return f"{SYSTEM_PROMPT}\n\nConversation:\n{history}User: {user_message}\nMindMate++:"
+    return f"{SYSTEM_PROMPT}\n\nUser: {user_message}\n\nMindMate++:"
+
+
+def session_id_from(data, headers):
+    """The caller's conversation id from the body or ``X-Session-Id``, if any."""
+    value = data.get("session_id") if isinstance(data, dict) else None
+    value = str(value or headers.get("X-Session-Id") or "").strip()
+    return value[:128] or None
+
+
+def session_history(session_id):
+    return conversations.history(session_id, HISTORY_TOKENS) if session_id else ""
+
+
+def record_turn(session_id, user_message, reply):
+    if session_id and reply:
+        conversations.append(session_id, user_message, reply)
+
 
 def _json_error(message, status_code=400):
     return jsonify({"ok": False, "error": message}), status_code
 
+def _reply(reply, source, status_code=200):
+    RESPONSE_SOURCES.inc(service="chatbot", source=source)
+    return jsonify({"reply": reply, "source": source}), status_code
+
+def cached_reply(user_message, history=""):
+    """A pooled reply for ``user_message``, or ``None`` if the model must answer.
+
+    Only conversation openers are cached; a message with history needs it.
+    """
+    if reply_cache is None or history:
+        return None
+    reply = reply_cache.get(user_message)
+    if reply is not None:
+        REPLY_CACHE_SAVED_SECONDS.inc(reply_cache.mean_miss_seconds, service="chatbot")
+    return reply
+
+def remember_reply(user_message, reply, latency_s, history=""):
+    if reply_cache is not None and not history:
+        reply_cache.put(user_message, reply, latency_s)
+
+def stream_format(accept, fmt=None):
+    """``"ndjson"`` when asked for by ``?format=`` or ``Accept``, else ``"sse"``."""
+    if fmt in ("ndjson", "sse"):
+        return fmt
+    return "ndjson" if "application/x-ndjson" in (accept or "") else "sse"
+
+
+STREAM_MIMETYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class ChatStream:
+    """Events for one streamed chat reply, encoded as SSE or NDJSON.
+
+    Time-to-first-token and total time are measured separately: the first
+    model token is recorded under the ``gemini_first_token`` stage (cached
+    replies are not), the whole stream under ``gemini_stream``, and both go
+    out in the final ``done`` event together with the reply source.
+    """
+
+    def __init__(self, fmt="sse"):
+        self.fmt = fmt
+        self.start = time.perf_counter()
+        self.ttft_s = None
+        self.parts = []
+
+    def _encode(self, event, data):
+        if self.fmt == "ndjson":
+            return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    def token(self, text, source="ai"):
+        if self.ttft_s is None:
+            self.ttft_s = time.perf_counter() - self.start
+            # A cached reply's near-zero first token says nothing about Gemini.
+            if source != "cache":
+                STAGE_SECONDS.observe(self.ttft_s, service="chatbot", stage="gemini_first_token")
+        self.parts.append(text)
+        return self._encode("token", {"text": text})
+
+    def fallback(self, user_message):
+        """Replace whatever was streamed so far with the rule-based reply."""
+        reply = fallback_reply(user_message)
+        discard = bool(self.parts)
+        self.parts = [reply]
+        return self._encode("fallback", {"text": reply, "discard_partial": discard})
+
+    @property
+    def reply(self):
+        return "".join(self.parts).strip()
+
+    def done(self, source):
+        total_s = time.perf_counter() - self.start
+        if source == "ai":
+            STAGE_SECONDS.observe(total_s, service="chatbot", stage="gemini_stream")
+        RESPONSE_SOURCES.inc(service="chatbot", source=source)
+        return self._encode("done", {
+            "source": source,
+            "reply": self.reply,
+            "ttft_ms": round(self.ttft_s * 1000, 1) if self.ttft_s is not None else None,
+            "total_ms": round(total_s * 1000, 1),
+        })
+
+
 def fallback_reply(user_text):
     """Rule-based fallback when AI model isn't available."""
     lowered = user_text.lower()
@@ -85,6 +260,7 @@ def home():
         "endpoints": {
             "health": "/health",
             "chat": "/chat (POST)",
+            "chat_stream": "/chat/stream (POST, SSE or NDJSON)",
             "study_plan": "/studyplan (POST)"
         }
     })
@@ -95,7 +271,10 @@ def health():
         "status": "healthy",
         "ai_enabled": model is not None,
         "service": "MindMate++ Chatbot",
-        "note": "Using fallback mode" if model is None else "AI mode active"
+        "note": "Using fallback mode" if model is None else "AI mode active",
+        "reply_cache": reply_cache.stats() if reply_cache is not None else None,
+        "conversations": conversations.stats(),
+        "llm": guarded_model.stats() if guarded_model is not None else None,
     })
 
 @app.route("/chat", methods=["POST"])
@@ -105,25 +284,81 @@ def chat():
         user_message = data.get("message", "").strip() if data else ""
         if not user_message:
             return jsonify({"error": "Message cannot be empty"}), 400
+        session_id = session_id_from(data, request.headers)
+        history = session_history(session_id)
 
+        reply, source = None, "fallback"
         if model:
-            try:
-                prompt = f"{SYSTEM_PROMPT}\n\nUser: {user_message}\n\nMindMate++:"
-                response = model.generate_content(prompt)
-                if hasattr(response, "text") and response.text:
-                    return jsonify({"reply": response.text.strip(), "source": "ai"})
-            except Exception as e:
-                print(f" Gemini response error: {e}")
+            cached = cached_reply(user_message, history)
+            if cached is not None:
+                reply, source = cached, "cache"
+            else:
+                try:
+                    start = time.perf_counter()
+                    reply = guarded_model.generate(build_chat_prompt(user_message, history))
+                    source = "ai"
+                    remember_reply(user_message, reply, time.perf_counter() - start, history)
+                except CircuitOpenError:
+                    pass
+                except Exception as e:
+                    print(f" Gemini response error: {e}")
 
         # Fallback if AI not available or fails
-        return jsonify({"reply": fallback_reply(user_message), "source": "fallback"})
+        if reply is None:
+            reply, source = fallback_reply(user_message), "fallback"
+        record_turn(session_id, user_message, reply)
+        return _reply(reply, source)
 
     except Exception as e:
         print(f" Chat endpoint error: {e}")
-        return jsonify({
-            "reply": "I'm here with you. I’m having a small hiccup right now, but I’m listening.",
-            "source": "error"
-        }), 500
+        return _reply(ERROR_REPLY, "error", 500)
+
+
+def _stream_chat(user_message, events, session_id=None):
+    history = session_history(session_id)
+    source = "fallback"
+    if model:
+        cached = cached_reply(user_message, history)
+        if cached is not None:
+            yield events.token(cached, source="cache")
+            source = "cache"
+        else:
+            try:
+                for text in guarded_model.stream(build_chat_prompt(user_message, history)):
+                    yield events.token(text)
+                if events.parts:
+                    source = "ai"
+                    remember_reply(user_message, events.reply, time.perf_counter() - events.start, history)
+            except CircuitOpenError:
+                pass
+            except Exception as e:
+                print(f" Gemini stream error: {e}")
+    if source == "fallback":
+        yield events.fallback(user_message)
+    yield events.done(source)
+    record_turn(session_id, user_message, events.reply)
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """Relay reply tokens as they arrive, as SSE or (``?format=ndjson``) NDJSON.
+
+    Events: ``token`` per chunk, ``fallback`` if the model fails or returns
+    nothing (``discard_partial`` says whether earlier tokens must be
+    dropped), then one ``done`` with ``source``, ``reply``, ``ttft_ms`` and
+    ``total_ms``.
+    """
+    data = request.get_json(silent=True)
+    user_message = str(data.get("message", "")).strip() if isinstance(data, dict) else ""
+    if not user_message:
+        return jsonify({"error": "Message cannot be empty"}), 400
+
+    fmt = stream_format(request.headers.get("Accept"), request.args.get("format"))
+    return Response(
+        _stream_chat(user_message, ChatStream(fmt), session_id_from(data, request.headers)),
+        mimetype=STREAM_MIMETYPES[fmt],
+        headers=STREAM_HEADERS,
+    )
 
 
 @app.route("/studyplan", methods=["POST"])
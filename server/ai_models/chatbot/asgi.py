@@ -0,0 +1,214 @@
+"""ASGI deployment of the chatbot: native async ``POST /chat`` and
+``POST /chat/stream``, Flask for the rest.
+
+In the WSGI app each ``/chat`` holds a worker thread for the whole Gemini
+call. Here a chat waiting on the model is just a suspended coroutine, so one
+process can hold hundreds of them. Outbound calls go through one shared
+client, capped by ``CHATBOT_LLM_CONCURRENCY`` and bounded by
+``CHATBOT_LLM_TIMEOUT``. Every other route (``/studyplan``, ``/health``,
+``/metrics``, CORS preflights, ...) is served by the Flask app through
+``WsgiToAsgi``.
+
+Run from ``server/ai_models/chatbot``:
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+Set ``LLM_BACKEND=stub`` to run against the offline stub model.
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (
+    CORS_ORIGINS,
+    ERROR_REPLY,
+    LLM_HEDGE_AFTER_S,
+    LLM_TIMEOUT_S,
+    STREAM_HEADERS,
+    STREAM_MIMETYPES,
+    ChatStream,
+    app as flask_app,
+    build_chat_prompt,
+    cached_reply,
+    fallback_reply,
+    llm_breaker,
+    model,
+    record_turn,
+    remember_reply,
+    session_history,
+    session_id_from,
+    stream_format,
+)
+from llm_client import AsyncLLMClient
+from shared.llm_guard import CircuitOpenError
+from shared.metrics import IN_FLIGHT, REQUEST_SECONDS, REQUESTS, RESPONSE_SOURCES, STAGE_SECONDS
+
+llm = AsyncLLMClient(
+    model,
+    max_concurrency=int(os.getenv("CHATBOT_LLM_CONCURRENCY", "64")),
+    timeout_s=LLM_TIMEOUT_S,
+    breaker=llm_breaker,
+    observe=lambda seconds: STAGE_SECONDS.observe(seconds, service="chatbot", stage="gemini"),
+    hedge_after_s=LLM_HEDGE_AFTER_S,
+) if model else None
+
+_flask = WsgiToAsgi(flask_app)
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def _headers(scope, content_type, extra=None):
+    headers = [(b"content-type", content_type.encode("latin-1"))]
+    headers += [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in (extra or {}).items()]
+    origin = dict(scope["headers"]).get(b"origin", b"").decode("latin-1")
+    if origin in CORS_ORIGINS:
+        headers += [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+    return headers
+
+
+async def _send_json(scope, send, status, payload):
+    headers = _headers(scope, "application/json")
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode("utf-8")})
+
+
+async def _message_from(scope, receive):
+    """``(message, session_id)`` from the JSON body (and ``X-Session-Id``)."""
+    try:
+        data = json.loads(await _read_body(receive) or b"{}")
+    except ValueError:
+        data = None
+    message = str(data.get("message", "")).strip() if isinstance(data, dict) else ""
+    session_header = dict(scope["headers"]).get(b"x-session-id", b"").decode("latin-1")
+    return message, session_id_from(data, {"X-Session-Id": session_header})
+
+
+async def chat_reply(user_message, session_id=None):
+    """``(reply, source)`` for one message, without blocking a thread."""
+    # The store takes a lock and may write to SQLite, so it runs off the loop.
+    history = await asyncio.to_thread(session_history, session_id)
+    reply, source = None, "fallback"
+    if llm is not None:
+        cached = cached_reply(user_message, history)
+        if cached is not None:
+            reply, source = cached, "cache"
+        else:
+            try:
+                start = time.perf_counter()
+                text = await llm.generate(build_chat_prompt(user_message, history))
+                if text:
+                    reply, source = text, "ai"
+                    remember_reply(user_message, text, time.perf_counter() - start, history)
+            except CircuitOpenError:
+                pass
+            except Exception as e:
+                print(f" Gemini response error: {e}")
+    if reply is None:
+        reply = fallback_reply(user_message)
+    await asyncio.to_thread(record_turn, session_id, user_message, reply)
+    return reply, source
+
+
+async def _chat(scope, receive, send):
+    start = time.perf_counter()
+    IN_FLIGHT.inc(service="chatbot")
+    status = 200
+    try:
+        user_message, session_id = await _message_from(scope, receive)
+        if not user_message:
+            status = 400
+            await _send_json(scope, send, status, {"error": "Message cannot be empty"})
+            return
+        try:
+            reply, source = await chat_reply(user_message, session_id)
+        except Exception as e:
+            print(f" Chat endpoint error: {e}")
+            reply, source, status = ERROR_REPLY, "error", 500
+        RESPONSE_SOURCES.inc(service="chatbot", source=source)
+        await _send_json(scope, send, status, {"reply": reply, "source": source})
+    finally:
+        IN_FLIGHT.dec(service="chatbot")
+        REQUESTS.inc(service="chatbot", endpoint="/chat", method="POST", status=str(status))
+        REQUEST_SECONDS.observe(time.perf_counter() - start, service="chatbot", endpoint="/chat")
+
+
+async def _stream_events(user_message, events, session_id=None):
+    history = await asyncio.to_thread(session_history, session_id)
+    source = "fallback"
+    if llm is not None:
+        cached = cached_reply(user_message, history)
+        if cached is not None:
+            yield events.token(cached, source="cache")
+            source = "cache"
+        else:
+            try:
+                async for text in llm.stream(build_chat_prompt(user_message, history)):
+                    yield events.token(text)
+                if events.parts:
+                    source = "ai"
+                    remember_reply(user_message, events.reply, time.perf_counter() - events.start, history)
+            except CircuitOpenError:
+                pass
+            except Exception as e:
+                print(f" Gemini stream error: {e}")
+    if source == "fallback":
+        yield events.fallback(user_message)
+    yield events.done(source)
+    await asyncio.to_thread(record_turn, session_id, user_message, events.reply)
+
+
+async def _chat_stream(scope, receive, send):
+    start = time.perf_counter()
+    IN_FLIGHT.inc(service="chatbot")
+    status = 200
+    try:
+        user_message, session_id = await _message_from(scope, receive)
+        if not user_message:
+            status = 400
+            await _send_json(scope, send, status, {"error": "Message cannot be empty"})
+            return
+        headers = dict(scope["headers"])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        fmt = stream_format(headers.get(b"accept", b"").decode("latin-1"), (query.get("format") or [None])[0])
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": _headers(scope, STREAM_MIMETYPES[fmt], STREAM_HEADERS),
+        })
+        async for event in _stream_events(user_message, ChatStream(fmt), session_id):
+            await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        IN_FLIGHT.dec(service="chatbot")
+        REQUESTS.inc(service="chatbot", endpoint="/chat/stream", method="POST", status=str(status))
+        REQUEST_SECONDS.observe(time.perf_counter() - start, service="chatbot", endpoint="/chat/stream")
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/chat" and scope["method"] == "POST":
+        await _chat(scope, receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/chat/stream" and scope["method"] == "POST":
+        await _chat_stream(scope, receive, send)
+    else:
+        await _flask(scope, receive, send)
@@ -2,6 +2,8 @@ import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 
+from conversation_store import fit_turns, render_turn
+
 
 env_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path=env_path)
@@ -31,12 +33,15 @@ Your goal is to sound like a caring friend who helps users feel seen, supported,
 """
 
 
+HISTORY_TOKENS = int(os.getenv("CHATBOT_HISTORY_TOKENS", "1024"))
+
+
 def generate_reply(user_input: str, history: list | None = None) -> str:
-    history = history or []
-    prompt = system_prompt + "\n\nConversation:\n"
-    for msg in history[-5:]:
-        prompt += f"User: {msg['user']}\nMindMate++: {msg['bot']}\n"
-    prompt += f"User: {user_input}\nMindMate++:"
+    turns = (render_turn(msg['user'], msg['bot']) for msg in history or [])
+    prompt = (
+        f"{system_prompt}\n\nConversation:\n"
+        f"{fit_turns(turns, HISTORY_TOKENS)}User: {user_input}\nMindMate++:"
+    )
 
     if not model:
         return "I’m here with you. Configure GEMINI_API_KEY to enable AI replies."
@@ -0,0 +1,169 @@
+"""Bounded per-session conversation memory for the chat service.
+
+Each session keeps its last ``max_turns`` exchanges in a ring buffer. A turn
+is rendered to prompt text and token-counted once, when it is added, so
+building a prompt is a walk over cached strings, newest first, until the
+token budget is spent. The assembled history is cached too, until the
+session gets a new turn.
+
+Sessions idle for longer than ``idle_ttl_s`` are evicted, as are the least
+recently used ones once there are more than ``max_sessions``. With
+``db_path`` every turn is also written to SQLite, so a session evicted from
+memory (or lost to a restart) is reloaded on its next message.
+"""
+from __future__ import annotations
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Iterable, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    # No tokenizer is loaded here. About 4 characters per token holds for
+    # Gemini on English, but Devanagari and Kannada often take a token or
+    # more per character, so every non-ASCII character counts as one.
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def render_turn(user: str, bot: str) -> tuple[str, int]:
+    text = f"User: {user}\nMindMate++: {bot}\n"
+    return text, estimate_tokens(text)
+
+
+def fit_turns(turns: Iterable[tuple[str, int]], budget_tokens: int) -> str:
+    """Join the newest rendered turns (oldest first in ``turns``) that fit ``budget_tokens``."""
+    kept = []
+    used = 0
+    for text, tokens in reversed(list(turns)):
+        if used + tokens > budget_tokens:
+            break
+        kept.append(text)
+        used += tokens
+    return "".join(reversed(kept))
+
+
+class _Session:
+    __slots__ = ("turns", "last_seen", "_history")
+
+    def __init__(self, max_turns: int) -> None:
+        self.turns: deque[tuple[str, int]] = deque(maxlen=max_turns)
+        self.last_seen = time.monotonic()
+        self._history: dict[int, str] = {}
+
+    def add(self, user: str, bot: str) -> None:
+        self.turns.append(render_turn(user, bot))
+        self._history.clear()
+
+    def history(self, budget_tokens: int) -> str:
+        text = self._history.get(budget_tokens)
+        if text is None:
+            text = self._history[budget_tokens] = fit_turns(self.turns, budget_tokens)
+        return text
+
+
+class ConversationStore:
+    def __init__(
+        self,
+        max_turns: int = 20,
+        idle_ttl_s: float = 1800.0,
+        max_sessions: int = 10000,
+        db_path: Optional[str] = None,
+    ) -> None:
+        self.max_turns = max(1, max_turns)
+        self.idle_ttl_s = idle_ttl_s
+        self.max_sessions = max(1, max_sessions)
+        self.db_path = db_path
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.restored = 0
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS turns ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,"
+                " user TEXT NOT NULL, bot TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id)")
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        # Sessions are kept in last-use order, so idle ones sit at the front.
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.idle_ttl_s:
+                break
+            del self._sessions[session_id]
+            self.evicted_idle += 1
+
+    def _load(self, session_id: str) -> _Session:
+        session = _Session(self.max_turns)
+        if self._conn is not None:
+            rows = self._conn.execute(
+                "SELECT user, bot FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.max_turns),
+            ).fetchall()
+            for user, bot in reversed(rows):
+                session.add(user, bot)
+            self.restored += bool(rows)
+        return session
+
+    def _session(self, session_id: str) -> _Session:
+        """The live session, loaded or created. Holds the lock."""
+        now = time.monotonic()
+        self._evict(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = self._load(session_id)
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted_lru += 1
+        return session
+
+    def history(self, session_id: str, budget_tokens: int) -> str:
+        """Rendered recent turns of ``session_id`` within ``budget_tokens``, oldest first."""
+        with self._lock:
+            return self._session(session_id).history(budget_tokens)
+
+    def append(self, session_id: str, user: str, bot: str) -> None:
+        with self._lock:
+            self._session(session_id).add(user, bot)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO turns (session_id, user, bot, created_at) VALUES (?, ?, ?, ?)",
+                    (session_id, user, bot, time.time()),
+                )
+                self._conn.execute(
+                    "DELETE FROM turns WHERE session_id = ? AND id NOT IN ("
+                    " SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                    (session_id, session_id, self.max_turns),
+                )
+                self._conn.commit()
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns,
+                "idle_ttl_s": self.idle_ttl_s,
+                "evicted_idle": self.evicted_idle,
+                "evicted_lru": self.evicted_lru,
+                "restored": self.restored,
+                "persistent": self._conn is not None,
+            }
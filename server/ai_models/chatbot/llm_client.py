@@ -0,0 +1,210 @@
+"""Bounded-concurrency async calls to one shared LLM client.
+
+The ``GenerativeModel`` (or stub) is created once per process, and every call
+goes through its async API on the same underlying channel. A semaphore caps
+the number of outbound calls in flight. The others wait for a slot, and the
+whole wait-plus-call is bounded by ``timeout_s``, so a request never hangs
+longer than that. With a ``breaker`` (``shared.llm_guard.CircuitBreaker``),
+calls fail at once with ``CircuitOpenError`` while it is open, and every
+outcome is reported to it. ``observe(seconds)`` is called for every
+``generate`` call that got past the breaker.
+
+``hedge_after_s`` works as in ``GuardedLLM``: a ``generate`` call that has
+not answered after that long, or that failed before then, gets one
+duplicate request, and the first answer wins. The other one is cancelled.
+Streams are not hedged.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Optional
+
+from shared.llm_guard import CircuitBreaker, CircuitOpenError
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        model: Any,
+        max_concurrency: int = 64,
+        timeout_s: float = 20.0,
+        breaker: Optional[CircuitBreaker] = None,
+        observe: Optional[Callable[[float], None]] = None,
+        hedge_after_s: Optional[float] = None,
+    ) -> None:
+        self.model = model
+        self.breaker = breaker
+        self.observe = observe
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_s = timeout_s
+        self.hedge_after_s = hedge_after_s
+        self._semaphores: dict[int, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rejected = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # A semaphore belongs to one event loop; there is normally just one.
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            semaphore = self._semaphores.get(loop_id)
+            if semaphore is None:
+                semaphore = self._semaphores[loop_id] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+    def _admit(self) -> None:
+        if self.breaker is not None and not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.breaker.name} LLM circuit is open")
+
+    def _record(self, ok: bool, duration_s: float) -> None:
+        if self.breaker is None:
+            return
+        if ok:
+            self.breaker.record_success(duration_s)
+        else:
+            self.breaker.record_failure()
+
+    async def _call(self, prompt: str, timeout_s: float) -> str:
+        self.waiting += 1
+        try:
+            await self._semaphore().acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            response = await self.model.generate_content_async(prompt, request_options={"timeout": timeout_s})
+        finally:
+            self.in_flight -= 1
+            self._semaphore().release()
+        return (getattr(response, "text", None) or "").strip()
+
+    async def _first_result(self, prompt: str, timeout_s: float) -> str:
+        if self.hedge_after_s is None:
+            return await self._call(prompt, timeout_s)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_s
+        primary = asyncio.ensure_future(self._call(prompt, timeout_s))
+        pending = {primary}
+        hedge_at: Optional[float] = loop.time() + self.hedge_after_s
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                wait_s = None if hedge_at is None else max(0.0, hedge_at - loop.time())
+                done, pending = await asyncio.wait(pending, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge_wins += task is not primary
+                        return task.result()
+                    error = task.exception()
+                if hedge_at is not None and (not pending or loop.time() >= hedge_at):
+                    # One duplicate, sent when the first call is slow or has already failed.
+                    hedge_at = None
+                    self.hedged += 1
+                    pending.add(asyncio.ensure_future(self._call(prompt, max(0.0, deadline - loop.time()))))
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(self, prompt: str, timeout_s: Optional[float] = None) -> str:
+        """Reply text for ``prompt``; raises ``TimeoutError`` past the deadline."""
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        self._admit()
+        start = time.monotonic()
+        try:
+            text = await asyncio.wait_for(self._first_result(prompt, timeout_s), timeout_s)
+        except asyncio.TimeoutError as exc:
+            self.timeouts += 1
+            self._record(False, 0.0)
+            raise TimeoutError(f"LLM call exceeded {timeout_s:.1f}s") from exc
+        except Exception:
+            self.errors += 1
+            self._record(False, 0.0)
+            raise
+        finally:
+            if self.observe is not None:
+                self.observe(time.monotonic() - start)
+        self.completed += 1
+        self._record(bool(text), time.monotonic() - start)
+        return text
+
+    async def stream(self, prompt: str, timeout_s: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield reply text chunks as they arrive.
+
+        The slot wait and the whole stream share one ``timeout_s`` deadline.
+        Past it, ``TimeoutError`` is raised between chunks.
+        """
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        self._admit()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout_s
+        first_chunk_s = None
+
+        def remaining() -> float:
+            return max(0.0, deadline - loop.time())
+
+        semaphore = self._semaphore()
+        acquired = False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), remaining())
+            acquired = True
+            self.waiting -= 1
+            self.in_flight += 1
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt, stream=True, request_options={"timeout": timeout_s}),
+                remaining(),
+            )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                except StopAsyncIteration:
+                    break
+                text = getattr(chunk, "text", None) or ""
+                if text:
+                    if first_chunk_s is None:
+                        first_chunk_s = loop.time() - start
+                    yield text
+            self.completed += 1
+            # Slowness is judged on the first chunk, as in GuardedLLM.stream.
+            self._record(first_chunk_s is not None, first_chunk_s or 0.0)
+        except asyncio.TimeoutError as exc:
+            self.timeouts += 1
+            self._record(False, 0.0)
+            raise TimeoutError(f"LLM stream exceeded {timeout_s:.1f}s") from exc
+        except Exception:
+            self.errors += 1
+            self._record(False, 0.0)
+            raise
+        finally:
+            if acquired:
+                self.in_flight -= 1
+                semaphore.release()
+            else:
+                self.waiting -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "timeout_s": self.timeout_s,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "hedge_after_s": self.hedge_after_s,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
@@ -0,0 +1,259 @@
+"""Reply cache for short, common chat openers.
+
+Much of the chat traffic opens with near-identical messages ("hi", "I feel
+anxious", "so stressed about exams"). A short message is reduced to a
+normalized key, and by default only the same key shares replies.
+
+With ``match="ngram"``, a message without an exact key may also use the
+most similar known key, by cosine similarity of character trigrams, when
+that clears ``threshold``. Near-identical spelling does not mean the same
+meaning ("feeling good" / "not feeling good" / "feeling bad"), so a fuzzy
+match is only tried between keys of at most ``fuzzy_max_chars`` characters
+that use exactly the same negation and sentiment words.
+
+Each key owns a pool of up to ``pool_size`` model replies:
+- A miss goes to the model, and its reply joins the pool.
+- Once ``pool_size`` model answers are in, later matches are served from it in rotation, so
+  the same opener does not always get the same line.
+- A pool expires ``ttl_s`` after it was started, and at most
+  ``max_entries`` pools are kept (least recently used first out).
+
+Messages that contain a risk-lexicon phrase never read from or write to the
+cache; they always get a fresh reply.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+# Stretched letters are cut to two, so "goood" and "good" share a key
+# without "good" turning into "god".
+_REPEATS = re.compile(r"(\w)\1{2,}")
+_DOUBLES = re.compile(r"(\w)\1")
+
+# Words that flip or set the meaning of a short message. Fuzzy matches must
+# agree on all of them. Keys are normalized, so "don't" is "dont".
+_NEGATIONS = frozenset({
+    "no", "not", "never", "nothing", "nobody", "none", "nor", "without", "hardly", "barely",
+    "cant", "cannot", "dont", "doesnt", "didnt", "isnt", "wasnt", "arent", "werent",
+    "wont", "wouldnt", "couldnt", "shouldnt", "havent", "hasnt", "aint",
+    "nahi", "nahin", "mat", "नहीं", "ना", "मत", "ಇಲ್ಲ", "ಬೇಡ",
+})
+_SENTIMENT = frozenset({
+    "good", "bad", "great", "fine", "ok", "okay", "well", "better", "worse", "best", "worst",
+    "happy", "sad", "glad", "upset", "calm", "anxious", "nervous", "stressed", "relaxed",
+    "excited", "scared", "afraid", "angry", "lonely", "tired", "awful", "terrible", "amazing",
+    "wonderful", "horrible", "love", "hate", "hopeful", "hopeless", "low", "down", "up",
+    "less", "more", "too", "very",
+})
+_POLAR = _NEGATIONS | _SENTIMENT
+
+
+def polarity_words(key: str) -> frozenset:
+    """The negation and sentiment words of a normalized key ("noo" counts as "no")."""
+    words = set()
+    for word in key.split():
+        if word not in _POLAR:
+            word = _DOUBLES.sub(r"\1", word)
+        if word in _POLAR:
+            words.add(word)
+    return frozenset(words)
+
+
+def normalize_message(text: str) -> str:
+    """Case, punctuation and stretched-letter insensitive form ("Goood!!" -> "good")."""
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = text.replace("’", "").replace("‘", "").replace("'", "")
+    text = _REPEATS.sub(r"\1\1", _PUNCTUATION.sub(" ", text))
+    return " ".join(text.split())
+
+
+def _squeeze(text: str) -> str:
+    return _DOUBLES.sub(r"\1", normalize_message(text))
+
+
+def _trigrams(key: str) -> Counter:
+    padded = f"  {key} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _cosine(a: Counter, norm_a: float, b: Counter, norm_b: float) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b[gram] for gram, count in a.items()) / (norm_a * norm_b)
+
+
+def load_risk_phrases(path: str) -> list[str]:
+    """Every phrase of every category in a ``{category: [phrases]}`` JSON file."""
+    try:
+        lexicon = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        print(f" Risk lexicon {path} unavailable: {exc}")
+        return []
+    return [phrase for phrases in lexicon.values() for phrase in phrases]
+
+
+class _Pool:
+    __slots__ = ("replies", "answers", "created", "next", "grams", "norm", "polarity")
+
+    def __init__(self, key: str) -> None:
+        self.replies: list[str] = []
+        # Model answers seen, duplicates included; a repetitive model still fills its pool.
+        self.answers = 0
+        self.created = time.monotonic()
+        self.next = 0
+        self.grams = _trigrams(key)
+        self.norm = math.sqrt(sum(count * count for count in self.grams.values()))
+        self.polarity = polarity_words(key)
+
+
+class ReplyCache:
+    def __init__(
+        self,
+        risk_phrases: Iterable[str] = (),
+        max_entries: int = 512,
+        ttl_s: float = 6 * 3600,
+        pool_size: int = 3,
+        threshold: float = 0.85,
+        match: str = "exact",
+        max_chars: int = 80,
+        fuzzy_max_chars: int = 24,
+    ) -> None:
+        if match not in ("exact", "ngram"):
+            raise ValueError(f"match must be 'exact' or 'ngram', not {match!r}")
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.pool_size = max(1, pool_size)
+        self.threshold = threshold
+        self.match = match
+        self.max_chars = max_chars
+        self.fuzzy_max_chars = fuzzy_max_chars
+        phrases = sorted({_squeeze(p) for p in risk_phrases if _squeeze(p)}, key=len, reverse=True)
+        # Phrases must start at a word boundary; inflected endings still match.
+        # Both sides have every letter run cut to one, so "dieee" still hits "die".
+        self._risk = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, phrases)) + ")") if phrases else None
+        self._pools: "OrderedDict[str, _Pool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fuzzy_hits = 0
+        self.bypassed_risk = 0
+        self.bypassed_long = 0
+        self._miss_seconds = 0.0
+        self._timed_misses = 0
+
+    def is_risky(self, text: str) -> bool:
+        return self._risk is not None and self._risk.search(_squeeze(text)) is not None
+
+    def _key_for(self, message: str) -> Optional[str]:
+        """Cache key for ``message``, or ``None`` when it must not be cached."""
+        if len(message) > self.max_chars:
+            self.bypassed_long += 1
+            return None
+        if self.is_risky(message):
+            self.bypassed_risk += 1
+            return None
+        return normalize_message(message) or None
+
+    def _resolve(self, key: str) -> tuple[Optional[str], bool]:
+        """The live pool key for ``key`` and whether it was a fuzzy match. Holds the lock."""
+        now = time.monotonic()
+        for stale in [k for k, pool in self._pools.items() if now - pool.created > self.ttl_s]:
+            del self._pools[stale]
+        if key in self._pools:
+            return key, False
+        if self.match != "ngram" or len(key) > self.fuzzy_max_chars:
+            return None, False
+        grams = _trigrams(key)
+        norm = math.sqrt(sum(count * count for count in grams.values()))
+        polarity = polarity_words(key)
+        best, best_score = None, self.threshold
+        for candidate, pool in self._pools.items():
+            if len(candidate) > self.fuzzy_max_chars or pool.polarity != polarity:
+                continue
+            score = _cosine(grams, norm, pool.grams, pool.norm)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best, best is not None
+
+    def get(self, message: str) -> Optional[str]:
+        """A pooled reply for ``message``, or ``None`` if it has to go to the model."""
+        key = self._key_for(message)
+        if key is None:
+            return None
+        with self._lock:
+            found, fuzzy = self._resolve(key)
+            pool = self._pools.get(found) if found else None
+            if pool is None or pool.answers < self.pool_size:
+                self.misses += 1
+                return None
+            self._pools.move_to_end(found)
+            reply = pool.replies[pool.next % len(pool.replies)]
+            pool.next += 1
+            self.hits += 1
+            self.fuzzy_hits += fuzzy
+            return reply
+
+    def put(self, message: str, reply: str, latency_s: Optional[float] = None) -> None:
+        """Add a model ``reply`` to the pool for ``message``; ``latency_s`` is what it cost."""
+        if latency_s is not None:
+            with self._lock:
+                self._miss_seconds += latency_s
+                self._timed_misses += 1
+        if len(message) > self.max_chars or self.is_risky(message):
+            return
+        key = normalize_message(message)
+        if not key or not reply:
+            return
+        with self._lock:
+            found, _ = self._resolve(key)
+            pool = self._pools.get(found) if found else None
+            if pool is None:
+                pool = self._pools[key] = _Pool(key)
+                found = key
+            if pool.answers < self.pool_size:
+                pool.answers += 1
+                if reply not in pool.replies:
+                    pool.replies.append(reply)
+            self._pools.move_to_end(found)
+            while len(self._pools) > self.max_entries:
+                self._pools.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pools.clear()
+
+    @property
+    def mean_miss_seconds(self) -> float:
+        return self._miss_seconds / self._timed_misses if self._timed_misses else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            ready = sum(1 for pool in self._pools.values() if pool.answers >= self.pool_size)
+            lookups = self.hits + self.misses
+            return {
+                "match": self.match,
+                "pools": len(self._pools),
+                "ready_pools": ready,
+                "max_entries": self.max_entries,
+                "pool_size": self.pool_size,
+                "ttl_s": self.ttl_s,
+                "threshold": self.threshold,
+                "fuzzy_max_chars": self.fuzzy_max_chars,
+                "hits": self.hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "bypassed_risk": self.bypassed_risk,
+                "bypassed_long": self.bypassed_long,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "mean_model_ms": round(self.mean_miss_seconds * 1000, 1),
+                "latency_saved_s": round(self.hits * self.mean_miss_seconds, 3),
+            }
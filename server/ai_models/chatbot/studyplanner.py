@@ -1,9 +1,15 @@
-import os, json, base64, mimetypes
+import os, sys, json, base64, mimetypes
 from datetime import datetime, timedelta, time
 from typing import List, Dict, Any, Tuple, Optional
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+_AI_MODELS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _AI_MODELS_ROOT not in sys.path:
+    sys.path.insert(0, _AI_MODELS_ROOT)
+
+from shared.llm_backend import llm_backend, load_model
+from shared.metrics import STAGE_SECONDS, STUDYPLAN_ATTEMPTS
+
 def dt(s: str) -> datetime:
     return datetime.fromisoformat(s.replace("Z", "+00:00"))
 
@@ -101,13 +107,12 @@ def validate_plan(items, avail):
     if not fixed_breaks_ok(items, avail): return False
     return True
 
-def _get_gemini_model(env_var: str, default_name: str) -> genai.GenerativeModel:
+def _get_gemini_model(env_var: str, default_name: str) -> Any:
+    """The planner's model; the offline stub when ``LLM_BACKEND=stub``."""
     api_key = os.getenv("GEMINI_API_KEY", "").strip()
-    if not api_key:
+    if not api_key and llm_backend() != "stub":
         raise RuntimeError("GEMINI_API_KEY is not set; update server/.env or export it before running the planner.")
-    genai.configure(api_key=api_key)
-    model_name = os.getenv(env_var, default_name)
-    return genai.GenerativeModel(model_name)
+    return load_model(os.getenv(env_var, default_name), api_key)
 
 
 def build_prompt(subjects, exams, avail, prefs):
@@ -149,7 +154,8 @@ def extract_exams_from_image(path: str):
     )
     content = [{"text": prompt}, {"inline_data": {"mime_type": mime, "data": encoded}}]
 
-    resp = model.generate_content(content)
+    with STAGE_SECONDS.time(service="chatbot", stage="gemini_vision"):
+        resp = model.generate_content(content)
     txt = resp.text
 
     s, e = txt.find("{"), txt.rfind("}")
@@ -162,12 +168,16 @@ def generate_plan(subjects, exams, avail, prefs=None, max_attempts: int = 3):
 
     last_error = None
     for attempt in range(1, max_attempts + 1):
-        resp = model.generate_content(prompt)
+        with STAGE_SECONDS.time(service="chatbot", stage="gemini"):
+            resp = model.generate_content(prompt)
         txt = resp.text
         s, e = txt.find("{"), txt.rfind("}")
         items = json.loads(txt[s:e+1])["items"]
 
-        if validate_plan(items, avail):
+        with STAGE_SECONDS.time(service="chatbot", stage="validate_plan"):
+            valid = validate_plan(items, avail)
+        STUDYPLAN_ATTEMPTS.inc(outcome="valid" if valid else "invalid")
+        if valid:
             return items
 
         last_error = f"Attempt {attempt} failed validation"
@@ -0,0 +1,46 @@
+"""Model backend selected by ``LLM_BACKEND``: ``gemini`` (default) or ``stub``.
+
+With ``stub``, every caller in the process shares one ``StubModel`` built
+from the ``LLM_STUB_*`` variables, so a seeded run stays reproducible across
+services and call sites. The variable is read at call time, after the
+services have loaded their ``.env``.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Optional
+
+from shared.llm_stub import StubModel
+
+BACKENDS = ("gemini", "stub")
+
+_stub: Optional[StubModel] = None
+_stub_lock = threading.Lock()
+
+
+def llm_backend() -> str:
+    backend = os.getenv("LLM_BACKEND", "gemini").strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"LLM_BACKEND must be one of {BACKENDS}, not {backend!r}")
+    return backend
+
+
+def shared_stub() -> StubModel:
+    global _stub
+    with _stub_lock:
+        if _stub is None:
+            _stub = StubModel.from_env()
+        return _stub
+
+
+def load_model(model_name: str, api_key: Optional[str] = None) -> Optional[Any]:
+    """A model with ``generate_content``, or ``None`` for Gemini without a key."""
+    if llm_backend() == "stub":
+        return shared_stub()
+    if not api_key:
+        return None
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key.strip())
+    return genai.GenerativeModel(model_name)
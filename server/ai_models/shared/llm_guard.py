@@ -0,0 +1,268 @@
+"""Deadline, circuit breaker and optional hedging around blocking LLM calls.
+
+``GuardedLLM.generate`` runs ``model.generate_content`` on an executor and
+waits at most ``timeout_s``. The caller gets ``TimeoutError`` at the
+deadline even if the upstream call hangs; the abandoned call finishes in the
+background. A caller may pass a shorter ``timeout_s`` to fit a request
+deadline. If that leaves less than ``min_timeout_s``, ``TimeoutError`` is
+raised without calling upstream, and running out of a caller's shorter
+deadline does not count against the breaker: it says nothing about upstream
+health.
+
+The circuit breaker counts consecutive failures. Timeouts, errors, empty
+replies and calls slower than ``slow_call_s`` all count. After
+``failure_threshold`` of them the breaker opens, and calls fail at once with
+``CircuitOpenError``, so callers switch to their rule-based reply without
+waiting. After ``reset_timeout_s`` the breaker goes half-open and lets
+``half_open_probes`` calls through. A successful probe closes it; a failed
+one opens it again.
+
+With ``hedge_after_s``, a call that has not answered after that long, or
+that failed before then, gets one duplicate request, and whichever answers
+first wins. This trims the tail at the cost of extra upstream calls, so it
+is off by default.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterator, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """The breaker is open; the caller should use its fallback right away."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        slow_call_s: Optional[float] = None,
+        half_open_probes: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_s = reset_timeout_s
+        self.slow_call_s = slow_call_s
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; counts a rejection if not."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN:
+                now = time.monotonic()
+                # A probe that never reported back (abandoned stream) frees its slot after a while.
+                if self._probes >= self.half_open_probes and now - self._probe_at >= self.reset_timeout_s:
+                    self._probes = 0
+                if self._probes < self.half_open_probes:
+                    self._probes += 1
+                    self._probe_at = now
+                    return True
+            self.rejected += 1
+            return False
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def record_success(self, duration_s: float) -> None:
+        if self.slow_call_s is not None and duration_s > self.slow_call_s:
+            self.record_failure()
+            return
+        with self._lock:
+            self._failures = 0
+            self.state = CLOSED
+
+    def release(self) -> None:
+        """Give back a call that ended without saying anything about upstream health."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self._open()
+
+    def stats(self) -> dict:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.reset_timeout_s - (time.monotonic() - self._opened_at))
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "slow_call_s": self.slow_call_s,
+                "reset_timeout_s": self.reset_timeout_s,
+                "retry_in_s": round(retry_in, 1),
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class GuardedLLM:
+    """A ``generate_content`` model behind a deadline, a breaker and optional hedging.
+
+    ``observe(seconds)`` is called for every ``generate`` call that went
+    upstream, but not for calls the open breaker rejected.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        breaker: CircuitBreaker,
+        timeout_s: float = 20.0,
+        hedge_after_s: Optional[float] = None,
+        executor: Optional[Executor] = None,
+        observe: Optional[Callable[[float], None]] = None,
+        min_timeout_s: float = 0.25,
+    ) -> None:
+        self.model = model
+        self.breaker = breaker
+        self.observe = observe
+        self.timeout_s = timeout_s
+        self.min_timeout_s = min_timeout_s
+        self.hedge_after_s = hedge_after_s
+        self._executor = executor or ThreadPoolExecutor(max_workers=16, thread_name_prefix=f"llm-{breaker.name}")
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _call(self, prompt: Any, timeout_s: float, **kwargs: Any) -> str:
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout_s}, **kwargs)
+        text = (getattr(response, "text", None) or "").strip()
+        if not text:
+            raise ValueError("LLM returned an empty reply")
+        return text
+
+    def _first_result(self, prompt: Any, timeout_s: float, **kwargs: Any) -> str:
+        deadline = time.monotonic() + timeout_s
+        primary = self._executor.submit(self._call, prompt, timeout_s, **kwargs)
+        pending: set[Future] = {primary}
+        hedge_at = None if self.hedge_after_s is None else time.monotonic() + self.hedge_after_s
+        error: Optional[BaseException] = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+            if hedge_at is not None and (not pending or time.monotonic() >= hedge_at):
+                # One duplicate, sent when the first call is slow or has already failed.
+                hedge_at = None
+                with self._lock:
+                    self.hedged += 1
+                pending.add(self._executor.submit(self._call, prompt, max(0.0, deadline - time.monotonic()), **kwargs))
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"LLM call exceeded {timeout_s:.1f}s")
+
+    def generate(self, prompt: Any, timeout_s: Optional[float] = None, **kwargs: Any) -> str:
+        """Reply text for ``prompt``.
+
+        Raises ``CircuitOpenError`` while the breaker is open, ``TimeoutError``
+        past the deadline or when ``timeout_s`` is below ``min_timeout_s``, or
+        the upstream error.
+        """
+        own_deadline = timeout_s is None or timeout_s >= self.timeout_s
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        if timeout_s < self.min_timeout_s:
+            raise TimeoutError(f"Only {max(0.0, timeout_s):.2f}s left for the LLM call")
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.breaker.name} LLM circuit is open")
+        with self._lock:
+            self.calls += 1
+        start = time.monotonic()
+        try:
+            text = self._first_result(prompt, timeout_s, **kwargs)
+        except TimeoutError:
+            if own_deadline:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        finally:
+            if self.observe is not None:
+                self.observe(time.monotonic() - start)
+        self.breaker.record_success(time.monotonic() - start)
+        return text
+
+    def stream(self, prompt: Any, timeout_s: Optional[float] = None) -> Iterator[str]:
+        """Yield reply chunks; the breaker sees the whole stream as one call.
+
+        Slowness is judged on the time to the first chunk. The deadline is
+        passed upstream as the request timeout only; chunks are not waited
+        on from another thread.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.breaker.name} LLM circuit is open")
+        with self._lock:
+            self.calls += 1
+        start = time.monotonic()
+        first_chunk_s = None
+        try:
+            chunks = self.model.generate_content(
+                prompt, stream=True, request_options={"timeout": self.timeout_s if timeout_s is None else timeout_s}
+            )
+            for chunk in chunks:
+                text = getattr(chunk, "text", None)
+                if text:
+                    if first_chunk_s is None:
+                        first_chunk_s = time.monotonic() - start
+                    yield text
+        except GeneratorExit:
+            # The client went away; that says nothing about upstream health.
+            raise
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        if first_chunk_s is not None:
+            self.breaker.record_success(first_chunk_s)
+        else:
+            self.breaker.record_failure()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {"calls": self.calls, "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+        return {
+            **self.breaker.stats(),
+            "timeout_s": self.timeout_s,
+            "hedge_after_s": self.hedge_after_s,
+            "min_timeout_s": self.min_timeout_s,
+            **counts,
+        }
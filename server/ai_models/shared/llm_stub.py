@@ -0,0 +1,276 @@
+"""Offline stand-in for a Gemini ``GenerativeModel``.
+
+It has the same call surface the services use: ``generate_content`` and
+``generate_content_async`` return an object with a ``.text`` attribute, and
+``stream=True`` returns the reply word by word. No key or network is needed,
+so the services can be load-tested on a laptop.
+
+The output depends on the prompt:
+- a study-planner prompt gets a study-plan JSON built from its SUBJECTS and
+  AVAILABILITY, which passes ``validate_plan``. With probability
+  ``invalid_plan_rate`` the plan breaks a rule (a 90-minute block) instead.
+- an exam-extraction prompt gets ``{"exams": [...]}``.
+- anything else gets one of ``replies``.
+
+Latency is drawn per call from ``latency_dist``:
+- ``fixed``: ``latency_ms``
+- ``uniform``: ``latency_ms`` plus or minus ``jitter_ms``
+- ``lognormal``: median ``latency_ms``, with ``sigma`` shaping the tail
+
+A call fails with ``StubError`` with probability ``error_rate``. With a
+``seed``, the whole sequence of latencies, errors and choices is
+reproducible. ``StubModel.from_env`` reads all of this from ``LLM_STUB_*``
+variables.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Iterator, Optional, Sequence
+
+DEFAULT_REPLY = "I hear you. That sounds like a lot to carry. What feels heaviest right now?"
+DEFAULT_REPLIES = (
+    DEFAULT_REPLY,
+    "Thank you for telling me. Let's take one slow breath together. What's on your mind most right now?",
+    "That makes sense, and you're not alone in it. What would help a little, even just for today?",
+)
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+# Mirrors studyplanner.FIXED_BREAKS, which validate_plan checks for.
+_FIXED_BREAKS = (("Lunch Break", 13, 14), ("Snack Break", 17, 18), ("Dinner Break", 20, 21))
+_PLANNER_MARKER = "You are a strict study planner."
+_EXAMS_MARKER = "Extract exam dates"
+
+
+class StubError(RuntimeError):
+    """Injected upstream failure."""
+
+
+@dataclass
+class StubResponse:
+    text: str
+
+
+def _prompt_text(prompt: Any) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in prompt)
+    return str(prompt)
+
+
+def _prompt_json(prompt: str, label: str, default: Any) -> Any:
+    match = re.search(rf"^{label}: (.*)$", prompt, re.MULTILINE)
+    if not match:
+        return default
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return default
+
+
+def _hm(value: str) -> tuple[int, int]:
+    hours, minutes = value.split(":")
+    return int(hours), int(minutes)
+
+
+def study_plan(subjects: Sequence[Any], availability: dict, valid: bool = True) -> dict:
+    """A plan for ``availability`` that ``validate_plan`` accepts (or, if not ``valid``, rejects)."""
+    names = [s.get("name") if isinstance(s, dict) else str(s) for s in subjects] or ["General"]
+    start_day = datetime.fromisoformat(str(availability.get("start_date") or date.today().isoformat())).date()
+    day_start, day_end = _hm(availability.get("daily_start", "09:00")), _hm(availability.get("daily_end", "17:00"))
+    cap = float(availability.get("max_hours_per_day", 4))
+
+    items = []
+    turn = 0
+    for offset in range(max(1, int(availability.get("days", 1)))):
+        day = start_day + timedelta(days=offset)
+        window_start = datetime.combine(day, datetime.min.time()).replace(hour=day_start[0], minute=day_start[1])
+        window_end = window_start.replace(hour=day_end[0], minute=day_end[1])
+        if window_end <= window_start:
+            window_end += timedelta(days=1)
+
+        breaks = []
+        for title, start_hour, end_hour in _FIXED_BREAKS:
+            brk_start = datetime.combine(day, datetime.min.time()).replace(hour=start_hour)
+            brk_end = brk_start.replace(hour=end_hour)
+            if brk_start < window_start:
+                brk_start += timedelta(days=1)
+                brk_end += timedelta(days=1)
+            if window_start <= brk_start and brk_end <= window_end:
+                breaks.append((brk_start, brk_end))
+                items.append({
+                    "title": title, "subjectName": "", "type": "break",
+                    "startISO": brk_start.isoformat(), "endISO": brk_end.isoformat(),
+                })
+
+        studied = 0
+        slot = window_start
+        while studied + 1 <= cap and slot + timedelta(hours=1) <= window_end:
+            slot_end = slot + timedelta(hours=1)
+            clash = next((end for start, end in breaks if slot < end and start < slot_end), None)
+            if clash is not None:
+                slot = clash
+                continue
+            name = names[turn % len(names)]
+            items.append({
+                "title": f"Study {name}", "subjectName": name, "type": "study",
+                "startISO": slot.isoformat(), "endISO": slot_end.isoformat(),
+            })
+            turn += 1
+            studied += 1
+            slot = slot_end
+
+    items.sort(key=lambda item: item["startISO"])
+    if not valid:
+        study = next((item for item in items if item["type"] == "study"), None)
+        if study is not None:
+            study["endISO"] = (datetime.fromisoformat(study["startISO"]) + timedelta(minutes=90)).isoformat()
+        else:
+            items.append({
+                "title": "Study", "subjectName": names[0], "type": "study",
+                "startISO": window_start.isoformat(), "endISO": (window_start + timedelta(minutes=90)).isoformat(),
+            })
+    return {"items": items}
+
+
+class _AsyncChunks:
+    def __init__(self, words: list[str], delay_s: float) -> None:
+        self._words = iter(words)
+        self._delay_s = delay_s
+
+    def __aiter__(self) -> "_AsyncChunks":
+        return self
+
+    async def __anext__(self) -> StubResponse:
+        word = next(self._words, None)
+        if word is None:
+            raise StopAsyncIteration
+        await asyncio.sleep(self._delay_s)
+        return StubResponse(word)
+
+
+class StubModel:
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        reply: Optional[str] = None,
+        replies: Sequence[str] = DEFAULT_REPLIES,
+        latency_dist: str = "fixed",
+        jitter_ms: float = 0.0,
+        sigma: float = 0.5,
+        error_rate: float = 0.0,
+        invalid_plan_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}, not {latency_dist!r}")
+        self.latency_s = max(0.0, latency_ms) / 1000
+        self.replies = (reply,) if reply else tuple(replies) or (DEFAULT_REPLY,)
+        self.latency_dist = latency_dist
+        self.jitter_s = max(0.0, jitter_ms) / 1000
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.invalid_plan_rate = invalid_plan_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "StubModel":
+        seed = os.getenv("LLM_STUB_SEED", "").strip()
+        return cls(
+            latency_ms=float(os.getenv("LLM_STUB_LATENCY_MS", "300")),
+            reply=os.getenv("LLM_STUB_REPLY") or None,
+            latency_dist=os.getenv("LLM_STUB_LATENCY_DIST", "fixed").strip().lower(),
+            jitter_ms=float(os.getenv("LLM_STUB_JITTER_MS", "0")),
+            sigma=float(os.getenv("LLM_STUB_SIGMA", "0.5")),
+            error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+            invalid_plan_rate=float(os.getenv("LLM_STUB_INVALID_PLAN_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+    @property
+    def reply(self) -> str:
+        return self.replies[0]
+
+    def _draw(self) -> tuple[float, bool, float]:
+        """``(latency_s, fails, choice)`` for one call."""
+        with self._lock:
+            if self.latency_dist == "uniform":
+                latency = self._random.uniform(self.latency_s - self.jitter_s, self.latency_s + self.jitter_s)
+            elif self.latency_dist == "lognormal":
+                latency = self.latency_s * math.exp(self._random.gauss(0.0, self.sigma))
+            else:
+                latency = self.latency_s
+            return max(0.0, latency), self._random.random() < self.error_rate, self._random.random()
+
+    def _text(self, prompt: Any, choice: float) -> str:
+        text = _prompt_text(prompt)
+        if _PLANNER_MARKER in text:
+            plan = study_plan(
+                _prompt_json(text, "SUBJECTS", []),
+                _prompt_json(text, "AVAILABILITY", {}),
+                valid=choice >= self.invalid_plan_rate,
+            )
+            return json.dumps(plan)
+        if _EXAMS_MARKER in text:
+            exam_day = date.today() + timedelta(days=14)
+            return json.dumps({"exams": [{"subject": "Mathematics", "date": exam_day.isoformat()}]})
+        return self.replies[int(choice * len(self.replies)) % len(self.replies)]
+
+    def _timeout(self, request_options: Optional[dict]) -> Optional[float]:
+        return (request_options or {}).get("timeout")
+
+    @staticmethod
+    def _words(text: str) -> list[str]:
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _stream(self, text: str, latency_s: float) -> Iterator[StubResponse]:
+        words = self._words(text)
+        for word in words:
+            time.sleep(latency_s / len(words))
+            yield StubResponse(word)
+
+    def generate_content(
+        self, prompt: Any, request_options: Optional[dict] = None, stream: bool = False, **kwargs: Any
+    ) -> Any:
+        latency_s, fails, choice = self._draw()
+        timeout = self._timeout(request_options)
+        if stream:
+            if fails:
+                raise StubError("injected stub model error")
+            return self._stream(self._text(prompt, choice), latency_s)
+        if timeout is not None and latency_s > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"stub model exceeded {timeout:.1f}s")
+        time.sleep(latency_s)
+        if fails:
+            raise StubError("injected stub model error")
+        return StubResponse(self._text(prompt, choice))
+
+    async def generate_content_async(
+        self, prompt: Any, request_options: Optional[dict] = None, stream: bool = False, **kwargs: Any
+    ) -> Any:
+        latency_s, fails, choice = self._draw()
+        timeout = self._timeout(request_options)
+        if stream:
+            if fails:
+                raise StubError("injected stub model error")
+            words = self._words(self._text(prompt, choice))
+            return _AsyncChunks(words, latency_s / len(words))
+        if timeout is not None and latency_s > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"stub model exceeded {timeout:.1f}s")
+        await asyncio.sleep(latency_s)
+        if fails:
+            raise StubError("injected stub model error")
+        return StubResponse(self._text(prompt, choice))
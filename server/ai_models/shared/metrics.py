@@ -0,0 +1,222 @@
+"""In-process Prometheus metrics shared by the chatbot and voice services.
+
+Counters, gauges and histograms are kept in memory. ``/metrics`` renders them
+in the Prometheus text exposition format (version 0.0.4). There is no client
+library or push gateway, so the endpoint also works offline: curl it, or
+point any Prometheus-compatible scraper at it.
+
+``instrument_flask`` adds per-endpoint request counts, latency histograms,
+an in-flight gauge and the ``/metrics`` route to an app. Stage timings,
+response sources and study-plan attempts are recorded by the services
+through the module-level metrics below.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits (ms) up to slow Whisper/Gemini calls (tens of s).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+            lines.extend(self._render_children(children))
+        return lines
+
+    def _render_children(self, children) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value[0])}" for key, value in children]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            cell = self._children.setdefault(key, [0.0])
+            cell[0] += amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            cell = self._children.setdefault(key, [0.0])
+            cell[0] += amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = [float(value)]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [per-bucket counts..., sum, count]
+            cell = self._children.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            idx = bisect.bisect_left(self.buckets, value)
+            if idx < len(self.buckets):
+                cell[idx] += 1
+            cell[-2] += value
+            cell[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_children(self, children) -> list[str]:
+        lines = []
+        for key, cell in children:
+            cumulative = 0
+            for bound, count in zip(self.buckets, cell):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cell[-1]}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(cell[-2])}")
+            lines.append(f"{self.name}_count{labels} {cell[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = Counter(
+    "mindmate_http_requests_total", "HTTP requests by endpoint, method and status.",
+    ("service", "endpoint", "method", "status"),
+)
+REQUEST_SECONDS = Histogram(
+    "mindmate_http_request_duration_seconds", "HTTP request latency by endpoint.",
+    ("service", "endpoint"),
+)
+IN_FLIGHT = Gauge("mindmate_http_requests_in_flight", "HTTP requests being handled.", ("service",))
+STAGE_SECONDS = Histogram(
+    "mindmate_stage_duration_seconds",
+    "Pipeline stage latency (audio_decode, whisper, emotion, gemini, validate_plan, ...).",
+    ("service", "stage"),
+)
+RESPONSE_SOURCES = Counter(
+    "mindmate_response_source_total", "Replies by source (ai, fallback, voice_fallback, error, ...).",
+    ("service", "source"),
+)
+REPLY_CACHE_SAVED_SECONDS = Counter(
+    "mindmate_reply_cache_saved_seconds_total",
+    "Estimated model latency avoided by chat replies served from the reply cache.",
+    ("service",),
+)
+STUDYPLAN_ATTEMPTS = Counter(
+    "mindmate_studyplan_attempts_total", "Study-plan generation attempts by validation outcome.",
+    ("outcome",),
+)
+
+
+def instrument_flask(app, service: str) -> None:
+    """Record request metrics for every route of ``app`` and serve ``/metrics``."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        IN_FLIGHT.inc(service=service)
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            REQUESTS.inc(service=service, endpoint=endpoint, method=request.method, status=str(response.status_code))
+            REQUEST_SECONDS.observe(time.perf_counter() - start, service=service, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        IN_FLIGHT.dec(service=service)
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -2,35 +2,132 @@ from __future__ import annotations
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import shutil
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 _PACKAGE_ROOT = Path(__file__).resolve().parents[1]
-if str(_PACKAGE_ROOT) not in sys.path:
-    sys.path.insert(0, str(_PACKAGE_ROOT))
+# voice_model for services.*, ai_models for shared.* (code common to both services).
+for _root in (_PACKAGE_ROOT, _PACKAGE_ROOT.parent):
+    if str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
 
-from services.asr_service import transcribe_audio
-from services.emotion_text import classify_emotion
+from services.asr_service import transcribe_audio, transcribe_samples
+from services.audio_decode import (
+    SAMPLE_RATE,
+    AudioDecodeError,
+    AudioTooLongError,
+    decode_audio,
+    decode_pcm,
+    needs_ffmpeg,
+)
+from services.deadline import Deadline, StageTimer
+from services.emotion_text import classify_emotion, classify_emotion_keywords, emotion_cache
+from services.ingest import MAX_AUDIO_SECONDS, MAX_UPLOAD_BYTES, UploadRejectedError, read_upload
+from services.inference_pool import InferencePool, PoolFullError, PoolRejectedError
+from services.language_pinning import normalize_language
+from services.language_pinning import tracker as language_tracker
+from services.model_registry import registry
+from services.result_cache import SQLiteCache, TieredCache, TTLCache
+from services.streaming import StreamingSession, StreamingSessionStore
+from shared.llm_backend import load_model
+from shared.llm_guard import CircuitBreaker, GuardedLLM
+from shared.metrics import RESPONSE_SOURCES, STAGE_SECONDS, instrument_flask
 
 app = Flask(__name__)
 CORS(app)
+instrument_flask(app, "voice")
+# Werkzeug enforces this while parsing multipart bodies; raw bodies are
+# capped chunk by chunk in services.ingest. The slack covers multipart framing.
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 2**20
 
 env_path = os.path.join(_PACKAGE_ROOT.parent, ".env")
 load_dotenv(dotenv_path=env_path)
 _api_key = (os.getenv("VOICE_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY") or "").strip()
 _voice_model_name = (os.getenv("VOICE_GEMINI_MODEL") or "gemini-2.5-flash").strip()
-_voice_chat_model = None
-if _api_key:
-    try:
-        genai.configure(api_key=_api_key)
-        _voice_chat_model = genai.GenerativeModel(_voice_model_name)
-    except Exception:
-        _voice_chat_model = None
+# LLM_BACKEND=stub swaps Gemini for the offline stub (see shared.llm_backend).
+try:
+    _voice_chat_model = load_model(_voice_model_name, _api_key)
+except Exception:
+    _voice_chat_model = None
+
+_WARMUP_CLIP = _PACKAGE_ROOT / "testing_data" / "testing-audio0.wav"
+
+
+def _warm_up_models() -> None:
+    """Run one inference per model on the bundled sample clip."""
+    transcript = (transcribe_audio(_WARMUP_CLIP.read_bytes()).get("text") or "").strip()
+    classify_emotion(transcript or "I am feeling okay today.")
+
+
+if os.getenv("VOICE_WARMUP", "false").lower() == "true":
+    registry.warm_up(_warm_up_models)
+
+_cache_ttl = float(os.getenv("VOICE_CACHE_TTL", "3600"))
+_cache_db = os.getenv("VOICE_CACHE_DB", "").strip()
+# Transcript, language and emotion keyed by a hash of the audio bytes, so
+# client retries skip Whisper and the emotion model. The reply is generated
+# per request, so a fallback reply never outlives an upstream outage.
+_analysis_cache = TieredCache(
+    TTLCache(max_size=int(os.getenv("VOICE_CACHE_SIZE", "256")), ttl_s=_cache_ttl),
+    SQLiteCache(_cache_db, ttl_s=_cache_ttl) if _cache_db else None,
+)
+
+# Bounded worker tier for Whisper + zero-shot inference (see services.inference_pool).
+_inference_pool = InferencePool(
+    workers=int(os.getenv("VOICE_INFERENCE_WORKERS", "4")),
+    max_queue=int(os.getenv("VOICE_INFERENCE_QUEUE", "16")),
+    queue_timeout_s=float(os.getenv("VOICE_INFERENCE_QUEUE_TIMEOUT", "10")),
+)
+
+# One deadline per request, split into per-stage budgets (see services.deadline).
+# If emotion runs out of time, the keyword-only label is used. If the reply
+# runs out, _fallback_voice_reply is used. The request never runs past the
+# deadline by more than the stage that is running.
+_REQUEST_DEADLINE_S = float(os.getenv("VOICE_REQUEST_DEADLINE_S", "15"))
+_STAGE_BUDGETS_S = {
+    "decode": float(os.getenv("VOICE_DECODE_BUDGET_S", "2")),
+    "transcribe": float(os.getenv("VOICE_TRANSCRIBE_BUDGET_S", "8")),
+    "emotion": float(os.getenv("VOICE_EMOTION_BUDGET_S", "2")),
+    "reply": float(os.getenv("VOICE_REPLY_BUDGET_S", "4")),
+}
+# Metric stage names for the StageTimer stages that differ.
+_STAGE_METRIC_NAMES = {"decode": "audio_decode", "transcribe": "whisper"}
+
+
+def _observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, service="voice", stage=_STAGE_METRIC_NAMES.get(stage, stage))
+
+
+# Gemini calls are I/O-bound and kept off the inference pool. They go through
+# a circuit breaker (see shared.llm_guard): after VOICE_BREAKER_FAILURES
+# failed or slow replies in a row, _fallback_voice_reply is used at once
+# until a probe succeeds.
+_reply_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("VOICE_REPLY_WORKERS", "8")), thread_name_prefix="voice-reply"
+)
+_voice_llm = GuardedLLM(
+    _voice_chat_model,
+    CircuitBreaker(
+        "voice",
+        failure_threshold=int(os.getenv("VOICE_BREAKER_FAILURES", "5")),
+        reset_timeout_s=float(os.getenv("VOICE_BREAKER_RESET_S", "30")),
+        slow_call_s=float(os.getenv("VOICE_SLOW_CALL_S", "3")) or None,
+    ),
+    timeout_s=_STAGE_BUDGETS_S["reply"],
+    hedge_after_s=float(os.getenv("VOICE_HEDGE_AFTER_S", "0")) or None,
+    executor=_reply_executor,
+    observe=lambda seconds: STAGE_SECONDS.observe(seconds, service="voice", stage="gemini"),
+) if _voice_chat_model is not None else None
+
+_stream_sessions = StreamingSessionStore(
+    idle_timeout_s=float(os.getenv("VOICE_STREAM_IDLE_TIMEOUT", "120"))
+)
 
 VOICE_SYSTEM_PROMPT = (
     "You are MindMate++ voice companion. Reply in 1-3 short, empathetic sentences. "
@@ -52,10 +149,14 @@ def _fallback_voice_reply(transcript: str, emotion: str) -> str:
     return "Thank you for sharing. I'm here with you."
 
 
-def _generate_voice_reply(transcript: str, emotion: str) -> tuple[str, str]:
+def _generate_voice_reply(transcript: str, emotion: str, timeout_s: float | None = None) -> tuple[str, str]:
+    """Gemini reply, or the rule-based one on error or an open breaker.
+
+    Raises ``TimeoutError`` when ``timeout_s`` runs out.
+    """
     if not transcript:
         return "", "voice_empty"
-    if _voice_chat_model is None:
+    if _voice_llm is None:
         return _fallback_voice_reply(transcript, emotion), "voice_fallback"
     prompt = (
         f"{VOICE_SYSTEM_PROMPT}\n\n"
@@ -64,10 +165,9 @@ def _generate_voice_reply(transcript: str, emotion: str) -> tuple[str, str]:
         "MindMate++:"
     )
     try:
-        response = _voice_chat_model.generate_content(prompt)
-        text = (getattr(response, "text", None) or "").strip()
-        if text:
-            return text, "voice_ai"
+        return _voice_llm.generate(prompt, timeout_s), "voice_ai"
+    except TimeoutError:
+        raise
     except Exception:
         pass
     return _fallback_voice_reply(transcript, emotion), "voice_fallback"
@@ -75,39 +175,188 @@ def _generate_voice_reply(transcript: str, emotion: str) -> tuple[str, str]:
 
 @app.get("/health")
 def health():
-    return jsonify({"status": "healthy", "service": "voice-model"})
+    return jsonify(
+        {
+            "status": "healthy",
+            "service": "voice-model",
+            "llm": _voice_llm.stats() if _voice_llm is not None else None,
+        }
+    )
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until the optional warm-up has finished."""
+    stats = registry.stats()
+    if not registry.ready:
+        return jsonify({"status": "warming", **stats}), 503
+    return jsonify({"status": "ready", **stats})
+
+
+@app.get("/stats")
+def stats():
+    return jsonify(
+        {
+            "analysis_cache": _analysis_cache.stats(),
+            "emotion_cache": emotion_cache.stats(),
+            "inference_pool": _inference_pool.stats(),
+            "language_pinning": language_tracker.stats(),
+        }
+    )
+
+
+def _rejected(exc: PoolRejectedError):
+    status = 429 if isinstance(exc, PoolFullError) else 503
+    response = jsonify({"error": str(exc), "retry_after": exc.retry_after_s})
+    response.status_code = status
+    response.headers["Retry-After"] = str(exc.retry_after_s)
+    return response
+
+
+def _emotion_within(transcript: str, deadline: Deadline, timer: StageTimer) -> str:
+    if not transcript:
+        return "neutral"
+    with timer.stage("emotion"):
+        try:
+            return _inference_pool.run_with_timeout(
+                deadline.budget(_STAGE_BUDGETS_S["emotion"]), classify_emotion, transcript
+            )
+        except (TimeoutError, PoolRejectedError):
+            timer.degrade("emotion")
+            return classify_emotion_keywords(transcript)
+
+
+def _reply_within(transcript: str, emotion: str, deadline: Deadline, timer: StageTimer) -> tuple[str, str]:
+    if not transcript:
+        return "", "voice_empty"
+    with timer.stage("reply"):
+        budget = deadline.budget(_STAGE_BUDGETS_S["reply"])
+        try:
+            return _generate_voice_reply(transcript, emotion, budget)
+        except TimeoutError:
+            timer.degrade("reply")
+            return _fallback_voice_reply(transcript, emotion), "voice_fallback"
+
+
+def _language_and_session() -> tuple[str | None, str | None]:
+    """Read the optional language hint and session id from query, form or headers.
+
+    Raises ``ValueError`` for an unknown language.
+    """
+    hint = request.values.get("language") or request.headers.get("X-Language")
+    session_id = request.values.get("session_id") or request.headers.get("X-Session-Id")
+    return normalize_language(hint), (session_id or "").strip() or None
+
+
+def _audio_format() -> tuple[str, int, int]:
+    """``(format, rate, channels)`` from the query string.
+
+    ``format`` is "container" (WAV, WebM, ...) or "pcm" (headerless s16le, with
+    ``rate`` and ``channels``). Raises ``ValueError`` for bad values.
+    """
+    audio_format = request.args.get("format", "container").lower()
+    if audio_format not in ("container", "pcm"):
+        raise ValueError("format must be 'container' or 'pcm'")
+    try:
+        sample_rate = int(request.args.get("rate", SAMPLE_RATE))
+        channels = int(request.args.get("channels", 1))
+    except ValueError:
+        raise ValueError("rate and channels must be integers") from None
+    if sample_rate <= 0 or channels <= 0:
+        raise ValueError("rate and channels must be positive")
+    return audio_format, sample_rate, channels
+
+
+def _read_audio_upload(sniff: bool = True) -> bytearray:
+    """The uploaded audio from a multipart ``audio`` file field or a raw body."""
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("audio") or next(iter(request.files.values()), None)
+        if upload is None:
+            return bytearray()
+        return read_upload(upload.stream, sniff=sniff)
+    return read_upload(request.stream, request.content_length, sniff=sniff)
+
+
+@app.errorhandler(413)
+def payload_too_large(exc):
+    return jsonify({"error": f"Upload is larger than the {MAX_UPLOAD_BYTES // 2**20} MB limit"}), 413
 
 
 @app.post("/analyze-audio")
 def analyze_audio():
-    audio_bytes = request.get_data(cache=False, as_text=False)
+    """Transcribe, classify and answer one clip.
+
+    The body is a container file (raw or as a multipart ``audio`` field), or
+    headerless s16le with ``?format=pcm&rate=...&channels=...``.
+    """
+    try:
+        audio_format, sample_rate, channels = _audio_format()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    try:
+        audio_bytes = _read_audio_upload(sniff=audio_format == "container")
+    except UploadRejectedError as exc:
+        return jsonify({"error": str(exc)}), exc.status_code
     if not audio_bytes:
         return jsonify({"error": "Empty audio payload"}), 400
-    if shutil.which("ffmpeg") is None:
+    if audio_format == "container" and needs_ffmpeg(audio_bytes) and shutil.which("ffmpeg") is None:
         return (
             jsonify(
                 {
-                    "error": "ffmpeg is required for Whisper audio decoding. Install ffmpeg and restart voice service."
+                    "error": "ffmpeg is required to decode compressed audio. Install ffmpeg or send WAV audio."
                 }
             ),
             500,
         )
 
     try:
-        result = transcribe_audio(audio_bytes)
-        transcript = (result.get("text") or "").strip()
-        language = result.get("language", "unknown")
-        emotion = classify_emotion(transcript) if transcript else "neutral"
-        reply, source = _generate_voice_reply(transcript, emotion)
-        return jsonify(
-            {
+        language_hint, session_id = _language_and_session()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    deadline = Deadline(_REQUEST_DEADLINE_S)
+    timer = StageTimer(observe=_observe_stage)
+    pcm_parts = (audio_format, str(sample_rate), str(channels)) if audio_format == "pcm" else ()
+    cache_key = TieredCache.key_for(audio_bytes, language_hint or "", *pcm_parts)
+    with timer.stage("cache"):
+        analysis = _analysis_cache.get(cache_key)
+
+    try:
+        if analysis is None:
+            with timer.stage("decode"):
+                if audio_format == "pcm":
+                    audio = decode_pcm(audio_bytes, sample_rate, channels, max_seconds=MAX_AUDIO_SECONDS)
+                else:
+                    audio = decode_audio(
+                        audio_bytes,
+                        timeout_s=deadline.budget(_STAGE_BUDGETS_S["decode"]),
+                        max_seconds=MAX_AUDIO_SECONDS,
+                    )
+            with timer.stage("transcribe"):
+                result = _inference_pool.run_with_timeout(
+                    deadline.budget(_STAGE_BUDGETS_S["transcribe"]), transcribe_samples, audio, language_hint, session_id
+                )
+            transcript = (result.get("text") or "").strip()
+            analysis = {
                 "transcript": transcript,
-                "language": language,
-                "emotion": emotion,
-                "reply": reply,
-                "source": source,
+                "language": result.get("language", "unknown"),
+                "emotion": _emotion_within(transcript, deadline, timer),
             }
-        )
+            # A keyword-only emotion label is not worth keeping.
+            if not timer.degraded:
+                _analysis_cache.set(cache_key, analysis)
+        reply, source = _reply_within(analysis["transcript"], analysis["emotion"], deadline, timer)
+        RESPONSE_SOURCES.inc(service="voice", source=source)
+        return jsonify({**analysis, "reply": reply, "source": source, **timer.report()})
+    except PoolRejectedError as exc:
+        return _rejected(exc)
+    except AudioTooLongError as exc:
+        return jsonify({"error": str(exc)}), 413
+    except TimeoutError as exc:
+        return jsonify({"error": f"Audio analysis exceeded its deadline: {exc}", **timer.report()}), 504
+    except AudioDecodeError:
+        # Treat undecodable/partial audio as empty utterance instead of hard failure.
+        return jsonify({"transcript": "", "language": "unknown", "emotion": "neutral"}), 200
     except FileNotFoundError as exc:
         if "ffmpeg" in str(exc).lower():
             return (
@@ -125,9 +374,95 @@ def analyze_audio():
         if "failed to load audio" in lowered or "invalid data found" in lowered:
             # Treat undecodable/partial audio as empty utterance instead of hard failure.
             return jsonify({"transcript": "", "language": "unknown", "emotion": "neutral"}), 200
+        RESPONSE_SOURCES.inc(service="voice", source="error")
         return jsonify({"error": f"Audio processing failed: {exc}"}), 500
 
 
+@app.post("/analyze-audio/stream")
+def start_audio_stream():
+    """Open a streaming session.
+
+    Query parameters: ``format`` ("container" for webm/ogg/wav pieces of one
+    recording, "pcm" for raw s16le), and for PCM ``rate`` and ``channels``.
+    ``language`` and ``session_id`` behave as for ``/analyze-audio``.
+    """
+    try:
+        audio_format, sample_rate, channels = _audio_format()
+        language_hint, session_id = _language_and_session()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    session = _stream_sessions.add(
+        StreamingSession(
+            partial(transcribe_samples, language=language_hint, session_id=session_id),
+            audio_format=audio_format,
+            sample_rate=sample_rate,
+            channels=channels,
+        )
+    )
+    return jsonify({"session_id": session.session_id}), 201
+
+
+@app.post("/analyze-audio/stream/<session_id>/chunk")
+def push_audio_chunk(session_id: str):
+    session = _stream_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired stream session"}), 404
+    try:
+        chunk = read_upload(request.stream, request.content_length, sniff=False)
+    except UploadRejectedError as exc:
+        return jsonify({"error": str(exc)}), exc.status_code
+    if not chunk:
+        return jsonify({"partials": []})
+    try:
+        partials = _inference_pool.run(session.add_chunk, chunk)
+    except PoolRejectedError as exc:
+        return _rejected(exc)
+    except UploadRejectedError as exc:
+        return jsonify({"error": str(exc)}), exc.status_code
+    except AudioTooLongError as exc:
+        return jsonify({"error": str(exc)}), 413
+    except AudioDecodeError as exc:
+        return jsonify({"error": str(exc)}), 415
+    except Exception as exc:
+        return jsonify({"error": f"Audio processing failed: {exc}"}), 500
+    return jsonify({"partials": partials})
+
+
+@app.post("/analyze-audio/stream/<session_id>/end")
+def finish_audio_stream(session_id: str):
+    session = _stream_sessions.pop(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired stream session"}), 404
+    deadline = Deadline(_REQUEST_DEADLINE_S)
+    timer = StageTimer(observe=_observe_stage)
+    try:
+        with timer.stage("transcribe"):
+            result = _inference_pool.run_with_timeout(deadline.budget(_STAGE_BUDGETS_S["transcribe"]), session.finish)
+    except PoolRejectedError as exc:
+        return _rejected(exc)
+    except TimeoutError as exc:
+        return jsonify({"error": f"Audio analysis exceeded its deadline: {exc}", **timer.report()}), 504
+    except Exception as exc:
+        return jsonify({"error": f"Audio processing failed: {exc}"}), 500
+
+    transcript = result["text"].strip()
+    emotion = _emotion_within(transcript, deadline, timer)
+    reply, source = _reply_within(transcript, emotion, deadline, timer)
+    RESPONSE_SOURCES.inc(service="voice", source=source)
+    return jsonify(
+        {
+            "transcript": transcript,
+            "language": result["language"],
+            "emotion": emotion,
+            "reply": reply,
+            "source": source,
+            "partials": result["partials"],
+            **timer.report(),
+        }
+    )
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("FLASK_VOICE_PORT", 5002))
     debug_mode = os.environ.get("FLASK_VOICE_DEBUG", "false").lower() == "true"
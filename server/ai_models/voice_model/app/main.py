@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import glob
+import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 _PACKAGE_ROOT = Path(__file__).resolve().parents[1]
@@ -11,6 +16,9 @@ if str(_PACKAGE_ROOT) not in sys.path:
 from services.asr_service import transcribe_audio
 from services.emotion_text import classify_emotion
 
+AUDIO_SUFFIXES = {".wav", ".mp3", ".m4a", ".ogg", ".oga", ".opus", ".webm", ".flac", ".aac", ".mp4"}
+OUTPUT_FIELDS = ["path", "transcript", "language", "emotion", "transcribe_ms", "emotion_ms", "total_ms", "error"]
+
 
 def _analyze_file(audio_path: Path) -> tuple[str, str, str]:
 	"""Return the transcript, detected language, and emotion for the audio file."""
@@ -41,6 +49,107 @@ def _run_for_path(path_str: str) -> bool:
 	return True
 
 
+def _collect_batch(pattern: str) -> list[Path]:
+	"""Audio files under a directory (recursively) or matching a glob, sorted."""
+	root = Path(pattern).expanduser()
+	if root.is_dir():
+		candidates = root.rglob("*")
+	else:
+		candidates = (Path(p) for p in glob.glob(str(root), recursive=True))
+	return sorted(p.resolve() for p in candidates if p.is_file() and p.suffix.lower() in AUDIO_SUFFIXES)
+
+
+def _analyze_row(audio_path: Path) -> dict:
+	"""One output row for ``audio_path``; failures are recorded, not raised."""
+	row = {field: "" for field in OUTPUT_FIELDS}
+	row["path"] = str(audio_path)
+	start = time.perf_counter()
+	try:
+		result = transcribe_audio(audio_path.read_bytes())
+		row["transcribe_ms"] = round((time.perf_counter() - start) * 1000, 1)
+		row["transcript"] = result["text"].strip()
+		row["language"] = result["language"]
+		emotion_start = time.perf_counter()
+		row["emotion"] = classify_emotion(row["transcript"])
+		row["emotion_ms"] = round((time.perf_counter() - emotion_start) * 1000, 1)
+	except Exception as exc:
+		row["error"] = f"{type(exc).__name__}: {exc}"
+	row["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+	return row
+
+
+def _completed_paths(output: Path, fmt: str) -> set[str]:
+	"""Paths that already have an error-free row in ``output``.
+
+	A line cut short by an interruption is ignored, so that file runs again.
+	"""
+	if not output.exists():
+		return set()
+	done = set()
+	with output.open(encoding="utf-8", newline="") as f:
+		if fmt == "csv":
+			rows = csv.DictReader(f)
+		else:
+			rows = []
+			for line in f:
+				try:
+					rows.append(json.loads(line))
+				except ValueError:
+					continue
+		for row in rows:
+			if row.get("path") and not row.get("error") and row.get("total_ms") not in (None, ""):
+				done.add(row["path"])
+	return done
+
+
+def _run_batch(pattern: str, output: Path, fmt: str, workers: int, resume: bool) -> int:
+	"""Analyze every matching file with ``workers`` threads sharing the loaded models.
+
+	Rows are appended to ``output`` as files finish and flushed one by one. A
+	resumed run skips files that already have an error-free row and appends
+	the rest. Returns the number of files that failed.
+	"""
+	paths = _collect_batch(pattern)
+	if not paths:
+		print(f"[!] No audio files found for {pattern}")
+		return 0
+
+	done = _completed_paths(output, fmt) if resume else set()
+	pending = [p for p in paths if str(p) not in done]
+	print(f"{len(paths)} files, {len(paths) - len(pending)} already done, {len(pending)} to analyze with {workers} workers")
+
+	append = resume and output.exists()
+	failed = 0
+	with output.open("a" if append else "w", encoding="utf-8", newline="") as f:
+		if append and output.stat().st_size and not output.read_bytes().endswith(b"\n"):
+			# Terminate a row cut short by the interruption.
+			f.write("\n")
+		writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS) if fmt == "csv" else None
+		if writer is not None and (not append or output.stat().st_size == 0):
+			writer.writeheader()
+		executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch")
+		try:
+			futures = [executor.submit(_analyze_row, path) for path in pending]
+			for finished, future in enumerate(as_completed(futures), 1):
+				row = future.result()
+				if writer is not None:
+					writer.writerow(row)
+				else:
+					f.write(json.dumps(row, ensure_ascii=False) + "\n")
+				f.flush()
+				if row["error"]:
+					failed += 1
+					print(f"[{finished}/{len(pending)}] {row['path']}: {row['error']}")
+				else:
+					print(f"[{finished}/{len(pending)}] {row['path']}: {row['emotion']} ({row['total_ms']:.0f} ms)")
+		except KeyboardInterrupt:
+			print("\nInterrupted; finished rows are saved. Re-run with --resume to continue.")
+			executor.shutdown(wait=False, cancel_futures=True)
+			raise
+		executor.shutdown()
+	return failed
+
+
 def main() -> None:
 	parser = argparse.ArgumentParser(
 		description="Analyze an audio file and print the transcript + emotion."
@@ -50,8 +159,30 @@ def main() -> None:
 		nargs="?",
 		help="Path to the audio file (wav/mp3/m4a). If omitted you will be prompted.",
 	)
+	parser.add_argument(
+		"--batch",
+		metavar="DIR_OR_GLOB",
+		help="Analyze every audio file in a directory (recursively) or matching a glob.",
+	)
+	parser.add_argument("--output", help="Batch results file (.jsonl or .csv).")
+	parser.add_argument("--format", choices=("jsonl", "csv"), help="Output format (default: from --output suffix).")
+	parser.add_argument("--workers", type=int, default=2, help="Parallel batch workers sharing the models.")
+	parser.add_argument("--resume", action="store_true", help="Skip files already analyzed in --output.")
 	args = parser.parse_args()
 
+	if args.batch:
+		if not args.output:
+			parser.error("--batch requires --output")
+		output = Path(args.output).expanduser()
+		fmt = args.format or ("csv" if output.suffix.lower() == ".csv" else "jsonl")
+		try:
+			failed = _run_batch(args.batch, output, fmt, args.workers, args.resume)
+		except KeyboardInterrupt:
+			raise SystemExit(130)
+		if failed:
+			raise SystemExit(1)
+		return
+
 	try:
 		if args.audio:
 			if not _run_for_path(args.audio):
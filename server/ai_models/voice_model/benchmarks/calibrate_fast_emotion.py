@@ -0,0 +1,210 @@
+"""Calibrate the embedding emotion engine and compare it with the zero-shot path.
+
+The fitted parameters are the softmax temperature and per-label biases. The
+target is agreement of the *mapped* labels ("happy", "sad", "Depressed",
+...) with the zero-shot engine, not accuracy against the hand labels. So the
+fast engine is tuned to behave like the current path, thresholds included.
+
+The labelled set is split by hand label into a fitting part and a held-out
+part (``--holdout``, seeded). The fit only sees the fitting part, and the
+agreement that matters is the one reported on the held-out part.
+
+Use ``--write`` to store the fit in ``services/data/emotion_fast_calibration.json``
+and commit that file. The run downloads both the zero-shot and the embedding
+model, so it needs Hugging Face access. The engine reads the file at load
+time. Without it, VOICE_EMOTION_ENGINE=embedding logs a warning at startup
+and the service uses the zero-shot engine.
+
+Usage:
+    python benchmarks/calibrate_fast_emotion.py [--holdout 0.3] [--seed 0] [--copies 4]
+        [--write] [--json report.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(_PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PACKAGE_ROOT))
+
+from services.emotion_fast import CALIBRATION_PATH, DEFAULT_CALIBRATION, EmbeddingEmotionEngine
+from services.emotion_text import (
+    _CANDIDATE_LABELS,
+    _label_from_scores,
+    _zero_shot_scores,
+    load_emotion_pipeline,
+    risk_lexicon,
+)
+
+LABELLED_TEXT = Path(__file__).resolve().parent / "data" / "emotion_labelled.jsonl"
+TEMPERATURES = (0.01, 0.015, 0.02, 0.03, 0.04, 0.05, 0.07, 0.1, 0.15, 0.2)
+BIAS_STEPS = (-1.0, -0.5, -0.25, 0.0, 0.25, 0.5, 1.0)
+
+
+def _mapped(risks: list[dict], scored: list[tuple[list[str], list[float]]]) -> list[str]:
+    return [_label_from_scores(risk, labels, scores) for risk, (labels, scores) in zip(risks, scored)]
+
+
+def _agreement(a: list[str], b: list[str]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _split(gold: list[str], holdout: float, seed: int) -> tuple[list[int], list[int]]:
+    """``(fit, held_out)`` indices, stratified by hand label."""
+    rng = random.Random(seed)
+    by_label: dict[str, list[int]] = {}
+    for i, label in enumerate(gold):
+        by_label.setdefault(label, []).append(i)
+    fit, held_out = [], []
+    for indexes in by_label.values():
+        rng.shuffle(indexes)
+        n = max(1, round(len(indexes) * holdout))
+        held_out += indexes[:n]
+        fit += indexes[n:]
+    return sorted(fit), sorted(held_out)
+
+
+def _pick(values: list, indexes: list[int]) -> list:
+    return [values[i] for i in indexes]
+
+
+def _fit(engine: EmbeddingEmotionEngine, sims: np.ndarray, risks: list[dict], reference: list[str]) -> dict:
+    """Grid-search the temperature, then coordinate-ascend per-label biases."""
+
+    def score(temperature: float, bias: np.ndarray) -> float:
+        engine.temperature, engine.bias = temperature, bias
+        return _agreement(_mapped(risks, engine.scores_from_similarities(sims)), reference)
+
+    bias = np.zeros(len(engine.labels), dtype=np.float32)
+    best_t = max(TEMPERATURES, key=lambda t: score(t, bias))
+    best = score(best_t, bias)
+    for _ in range(3):
+        improved = False
+        for i in range(len(bias)):
+            for step in BIAS_STEPS:
+                trial = bias.copy()
+                trial[i] += step
+                value = score(best_t, trial)
+                if value > best:
+                    best, bias, improved = value, trial, True
+        if not improved:
+            break
+
+    engine.temperature, engine.bias = best_t, bias
+    return {
+        "temperature": best_t,
+        "bias": {label: round(float(b), 3) for label, b in zip(engine.labels, bias) if b},
+        "agreement_fit": round(best, 4),
+    }
+
+
+def _median_ms(fn, items) -> float:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding vs zero-shot emotion engine report")
+    parser.add_argument("--holdout", type=float, default=0.3, help="Share of each label held out from the fit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--copies", type=int, default=4, help="Repeat the set this many times for throughput")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--write", action="store_true", help="Save the fitted calibration")
+    parser.add_argument("--json", help="Write the full report to this path")
+    args = parser.parse_args()
+
+    samples = [json.loads(line) for line in LABELLED_TEXT.read_text(encoding="utf-8").splitlines() if line.strip()]
+    texts = [sample["text"] for sample in samples]
+    gold = [sample["label"] for sample in samples]
+    risks = [risk_lexicon.matcher.matched_categories(text) for text in texts]
+
+    fit_idx, held_idx = _split(gold, args.holdout, args.seed)
+
+    zsc = load_emotion_pipeline()
+    engine = EmbeddingEmotionEngine(_CANDIDATE_LABELS, calibration=DEFAULT_CALIBRATION)
+
+    reference = _mapped(risks, _zero_shot_scores(zsc, texts, args.batch_size))
+    sims = engine.similarities(texts)
+    held_sims, held_risks, held_reference = sims[held_idx], _pick(risks, held_idx), _pick(reference, held_idx)
+    uncalibrated = _agreement(_mapped(held_risks, engine.scores_from_similarities(held_sims)), held_reference)
+    calibration = _fit(engine, sims[fit_idx], _pick(risks, fit_idx), _pick(reference, fit_idx))
+    calibration["agreement_held_out"] = round(
+        _agreement(_mapped(held_risks, engine.scores_from_similarities(held_sims)), held_reference), 4
+    )
+    fast = _mapped(risks, engine.scores_from_similarities(sims))
+
+    corpus = texts * args.copies
+    start = time.perf_counter()
+    _zero_shot_scores(zsc, corpus, args.batch_size)
+    zeroshot_batch_s = time.perf_counter() - start
+    start = time.perf_counter()
+    engine.scores(corpus)
+    fast_batch_s = time.perf_counter() - start
+
+    report = {
+        "messages": len(texts),
+        "split": {"fit": len(fit_idx), "held_out": len(held_idx), "seed": args.seed},
+        "calibration": calibration,
+        "agreement_held_out_uncalibrated": round(uncalibrated, 4),
+        "accuracy_held_out": {
+            "zeroshot": round(_agreement(held_reference, _pick(gold, held_idx)), 4),
+            "embedding": round(_agreement(_pick(fast, held_idx), _pick(gold, held_idx)), 4),
+        },
+        "single_ms_median": {
+            "zeroshot": round(_median_ms(lambda t: zsc(t, _CANDIDATE_LABELS, multi_label=False), texts), 2),
+            "embedding": round(_median_ms(lambda t: engine.scores([t]), texts), 2),
+        },
+        "batched_msg_per_s": {
+            "zeroshot": round(len(corpus) / zeroshot_batch_s, 1),
+            "embedding": round(len(corpus) / fast_batch_s, 1),
+        },
+        "disagreements": [
+            {"text": text, "zeroshot": a, "embedding": b}
+            for text, a, b in zip(texts, reference, fast) if a != b
+        ],
+    }
+
+    print(f"messages            : {report['messages']} ({len(fit_idx)} fit, {len(held_idx)} held out)")
+    print(f"temperature / biases: {calibration['temperature']} / {calibration['bias'] or '{}'}")
+    print(f"agreement (fit)     : {calibration['agreement_fit']:.3f}")
+    print(
+        f"agreement (held out): {report['agreement_held_out_uncalibrated']:.3f} uncalibrated"
+        f" -> {calibration['agreement_held_out']:.3f}"
+    )
+    print(f"{'engine':<11}{'acc(held)':>10}{'single p50':>13}{'batched':>14}")
+    for name in ("zeroshot", "embedding"):
+        print(
+            f"{name:<11}{report['accuracy_held_out'][name]:>10.3f}"
+            f"{report['single_ms_median'][name]:>11.1f}ms"
+            f"{report['batched_msg_per_s'][name]:>9.1f} msg/s"
+        )
+    for row in report["disagreements"][:10]:
+        print(f"  {row['zeroshot']!r} vs {row['embedding']!r}: {row['text']}")
+
+    if args.write:
+        stored = {
+            "temperature": calibration["temperature"],
+            "bias": calibration["bias"],
+            "agreement_held_out": calibration["agreement_held_out"],
+            "split": report["split"],
+        }
+        CALIBRATION_PATH.write_text(json.dumps(stored, indent=2) + "\n", encoding="utf-8")
+        print(f"calibration written to {CALIBRATION_PATH}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the legacy temp-file + ffmpeg decode path with in-memory decoding.
+
+Usage:
+    python benchmarks/decode_benchmark.py [--repeats 20]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(_PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PACKAGE_ROOT))
+
+import whisper
+
+from services.audio_decode import decode_audio, decode_with_ffmpeg_pipe
+
+TESTING_DATA = _PACKAGE_ROOT / "testing_data"
+
+
+def _legacy_decode(audio_bytes: bytes):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
+        f.write(audio_bytes)
+        temp_path = f.name
+    try:
+        return whisper.load_audio(temp_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _time_ms(fn, audio_bytes: bytes, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(audio_bytes)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(TESTING_DATA.glob("*.wav"))
+    if not paths:
+        raise SystemExit(f"No WAV files found in {TESTING_DATA}")
+
+    print(f"{'file':<28}{'tempfile+ffmpeg':>18}{'ffmpeg pipe':>14}{'in-memory':>12}{'saved':>10}")
+    savings = []
+    for path in paths:
+        audio_bytes = path.read_bytes()
+        legacy = _time_ms(_legacy_decode, audio_bytes, args.repeats)
+        pipe = _time_ms(decode_with_ffmpeg_pipe, audio_bytes, args.repeats)
+        in_memory = _time_ms(decode_audio, audio_bytes, args.repeats)
+        savings.append(legacy - in_memory)
+        print(f"{path.name:<28}{legacy:>16.1f}ms{pipe:>12.1f}ms{in_memory:>10.1f}ms{legacy - in_memory:>8.1f}ms")
+
+    print(f"\nMedian per-request saving: {statistics.median(savings):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
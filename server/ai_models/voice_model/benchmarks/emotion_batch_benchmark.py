@@ -0,0 +1,55 @@
+"""Check that classify_emotions matches classify_emotion and compare throughput.
+
+Usage:
+    python benchmarks/emotion_batch_benchmark.py [--copies 4] [--batch-size 64]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(_PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PACKAGE_ROOT))
+
+from services.emotion_text import classify_emotion, classify_emotions
+
+LABELLED_TEXT = Path(__file__).resolve().parent / "data" / "emotion_labelled.jsonl"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batched emotion classification benchmark")
+    parser.add_argument("--copies", type=int, default=4, help="Repeat the labelled set this many times")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    samples = [json.loads(line) for line in LABELLED_TEXT.read_text(encoding="utf-8").splitlines() if line.strip()]
+    texts = [sample["text"] for sample in samples] * args.copies
+
+    # Load the model outside the timed region.
+    classify_emotion("warm up")
+
+    start = time.perf_counter()
+    single = [classify_emotion(text, cache=False) for text in texts]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = classify_emotions(texts, batch_size=args.batch_size, cache=False)
+    batched_s = time.perf_counter() - start
+
+    mismatches = [(t, a, b) for t, a, b in zip(texts, single, batched) if a != b]
+    print(f"messages        : {len(texts)}")
+    print(f"single-item     : {len(texts) / single_s:8.1f} msg/s")
+    print(f"classify_emotions: {len(texts) / batched_s:8.1f} msg/s ({single_s / batched_s:.1f}x)")
+    print(f"label mismatches: {len(mismatches)}")
+    for text, a, b in mismatches[:10]:
+        print(f"  {a!r} vs {b!r}: {text}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
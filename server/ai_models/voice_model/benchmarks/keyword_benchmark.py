@@ -0,0 +1,145 @@
+"""Compare per-keyword substring scans with the compiled risk-lexicon matcher.
+
+The compiled matcher's cost does not grow with the number of phrases. The
+substring scans grow linearly, so the benchmark also runs a lexicon padded
+with ``--extra-phrases`` synthetic entries.
+
+On the shipped 75-phrase lexicon the compiled matcher is not faster than
+the substring scan, which skips normalization and boundary checks. Medians
+from one run with the C automaton: 0.01ms for both on a 163-char
+transcript; 0.87ms against 0.38ms at 10 KB (``--sentences 200``); 9.0ms
+against 4.2ms at 100 KB (``--sentences 2000``), about half of it NFC and
+whitespace normalization. It only pulls ahead on large lexicons, e.g. 9.7ms
+against 69ms with 1075 phrases at 100 KB. The pure-Python automaton takes
+33-40ms at 100 KB.
+
+Before timing, both automatons are checked against ``REGRESSION_CASES``.
+The run stops with exit code 1 if any case gets the wrong categories.
+``--check-only`` runs just these checks.
+
+Usage:
+    python benchmarks/keyword_benchmark.py [--sentences 200] [--repeats 50] [--check-only]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(_PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PACKAGE_ROOT))
+
+from services.keyword_matcher import KeywordMatcher, LexiconFile
+
+LEXICON_PATH = _PACKAGE_ROOT / "services" / "data" / "risk_lexicon.json"
+
+FILLER = [
+    "I went to college today and the lectures were long.",
+    "मैं आज बाजार गया और सब्ज़ियाँ खरीदीं।",
+    "ನಾನು ಬೆಳಿಗ್ಗೆ ಕಾಲೇಜಿಗೆ ಹೋದೆ ಮತ್ತು ಸ್ನೇಹಿತರನ್ನು ಭೇಟಿಯಾದೆ.",
+    "My exams are next week and I keep revising the same chapters.",
+    "The weather was glossy and bright after the rain.",
+]
+
+# (text, expected categories). Inflected forms must keep matching, as they did
+# with plain substring scans; words merely containing a phrase must not.
+REGRESSION_CASES = [
+    ("I keep self-harming", {"suicidal"}),
+    ("i have been self harming again", {"suicidal"}),
+    ("thinking about suicides", {"suicidal"}),
+    ("feeling hopelessness", {"despair"}),
+    ("total worthlessness", {"despair"}),
+    ("The weather was glossy and bright after the rain.", set()),
+    ("मैं मरना चाहता हूँ", {"suicidal"}),
+    ("मैं बहुत दुखी हूँ", {"loss"}),
+    ("उसके जाने के बाद से दुखों का पहाड़ टूट पड़ा", {"loss"}),
+    ("मैंने हार मानी", {"despair"}),
+    ("अशोक कल आया था", set()),
+    ("ಅವನು ತುಂಬಾ ದುಃಖಿತನಾಗಿದ್ದಾನೆ", {"loss"}),
+    ("ನನಗೆ ನಿರಾಶೆಯಾಗಿದೆ", {"despair"}),
+    ("ಅಜ್ಜಿಯ ಮರಣದ ನಂತರ", {"loss"}),
+]
+
+
+def check_cases(lexicon: dict[str, list[str]]) -> list[str]:
+    """Failure messages for ``REGRESSION_CASES`` on every available automaton."""
+    failures = []
+    for use_c in (False, True):
+        matcher = KeywordMatcher(lexicon, use_c_automaton=use_c)
+        if use_c and matcher.backend != "pyahocorasick":
+            continue
+        for text, expected in REGRESSION_CASES:
+            found = set(matcher.matched_categories(text))
+            if found != expected:
+                failures.append(f"[{matcher.backend}] {text!r}: expected {sorted(expected)}, got {sorted(found)}")
+    return failures
+
+
+def _naive(text: str, lexicon: dict[str, list[str]]) -> set[str]:
+    text_l = text.lower()
+    return {category for category, phrases in lexicon.items() if any(p in text_l for p in phrases)}
+
+
+def _time_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _synthetic_phrases(count: int, rng: random.Random) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        " ".join("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(2))
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Risk-lexicon matcher benchmark")
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--extra-phrases", type=int, default=1000)
+    parser.add_argument("--check-only", action="store_true", help="Only run the regression cases")
+    args = parser.parse_args()
+
+    base = LexiconFile(LEXICON_PATH).lexicon
+    failures = check_cases(base)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        raise SystemExit(1)
+    print(f"regression cases: {len(REGRESSION_CASES)} ok")
+    if args.check_only:
+        return
+
+    rng = random.Random(0)
+    sentences = [rng.choice(FILLER) for _ in range(args.sentences)]
+    sentences.append("Some days I feel there is no hope left.")
+    transcript = " ".join(sentences)
+
+    padded = {**base, "synthetic": _synthetic_phrases(args.extra_phrases, rng)}
+
+    print(f"transcript: {len(transcript)} chars")
+    print(f"{'lexicon':<10}{'phrases':>9}{'substring':>12}{'compiled(py)':>14}{'compiled(C)':>13}")
+    for name, lexicon in (("risk", base), ("padded", padded)):
+        naive_ms = _time_ms(lambda: _naive(transcript, lexicon), args.repeats)
+        row = f"{name:<10}{sum(len(v) for v in lexicon.values()):>9}{naive_ms:>10.2f}ms"
+        for use_c in (False, True):
+            matcher = KeywordMatcher(lexicon, use_c_automaton=use_c)
+            if use_c and matcher.backend != "pyahocorasick":
+                row += f"{'n/a':>13}"
+                continue
+            compiled_ms = _time_ms(lambda: matcher.matched_categories(transcript), args.repeats)
+            row += f"{compiled_ms:>12.2f}ms"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure what skipping Whisper language detection saves.
+
+Each English and Hindi sample is transcribed three ways:
+- with detection
+- with an explicit language hint
+- as a two-clip session, where the second clip uses the pinned language
+
+Usage:
+    python benchmarks/language_benchmark.py [--repeats 3]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(_PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PACKAGE_ROOT))
+
+from services.asr_service import transcribe_audio
+from services.language_pinning import tracker
+
+TESTING_DATA = _PACKAGE_ROOT / "testing_data"
+SAMPLES = {
+    "testing-audio4.wav": "en",
+    "testing-audio5.wav": "en",
+    "testing-audiohindi1.wav": "hi",
+}
+
+
+def _time_ms(fn) -> tuple[float, dict]:
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Language hint / pinning benchmark")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    # Load the model before timing anything.
+    transcribe_audio((TESTING_DATA / "testing-audio4.wav").read_bytes())
+
+    print(f"{'file':<26}{'expected':>9}{'detect':>10}{'hinted':>10}{'pinned':>10}  languages")
+    for name, expected in SAMPLES.items():
+        audio_bytes = (TESTING_DATA / name).read_bytes()
+        detect, hinted, pinned = [], [], []
+        seen = set()
+        for i in range(args.repeats):
+            ms, result = _time_ms(lambda: transcribe_audio(audio_bytes))
+            detect.append(ms)
+            seen.add(result["language"])
+
+            ms, result = _time_ms(lambda: transcribe_audio(audio_bytes, language=expected))
+            hinted.append(ms)
+            seen.add(result["language"])
+
+            session_id = f"bench-{name}-{i}"
+            transcribe_audio(audio_bytes, session_id=session_id)
+            ms, result = _time_ms(lambda: transcribe_audio(audio_bytes, session_id=session_id))
+            pinned.append(ms)
+            seen.add(result["language"])
+
+        print(
+            f"{name:<26}{expected:>9}"
+            f"{statistics.median(detect):>8.0f}ms{statistics.median(hinted):>8.0f}ms"
+            f"{statistics.median(pinned):>8.0f}ms  {','.join(sorted(seen))}"
+        )
+
+    print(f"\nPinning stats: {tracker.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Reproducible end-to-end benchmark of the voice pipeline, with a regression gate.
+
+Each clip runs through ``transcribe_audio`` then ``classify_emotion``, then
+a stubbed Gemini reply whose latency is fixed by ``--llm-latency-ms``. No
+network is needed. The clips are the WAVs in ``testing_data`` plus synthetic
+variants:
+- 5 s of silence
+- every clip concatenated into one long recording
+- the first clip resampled to 8 kHz
+- the first clip as 44.1 kHz stereo
+
+Reported:
+- cold start: the first request in a fresh process, model loads included
+- warm latency per clip and stage, and the real-time factor (transcribe
+  seconds per audio second)
+- throughput and latency percentiles at each ``--concurrency`` level
+- peak RSS
+
+The report is written to ``--output``. If a baseline exists, every metric is
+compared against it, and a change worse than ``--threshold`` (relative)
+fails the run with exit code 1. ``--write-baseline`` stores the current run
+as the new baseline.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--repeats 3] [--concurrency 1,2,4]
+        [--output pipeline_report.json] [--baseline benchmarks/data/pipeline_baseline.json]
+        [--threshold 0.15] [--rss-threshold 0.10] [--write-baseline]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(_PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PACKAGE_ROOT))
+
+from services.asr_service import WHISPER_MODEL_NAME, transcribe_audio
+from services.audio_decode import SAMPLE_RATE, decode_audio
+from services.emotion_text import EMOTION_ENGINE, classify_emotion
+from services.model_registry import rss_bytes
+from services.quantization import QUANTIZE_MODE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TESTING_DATA = _PACKAGE_ROOT / "testing_data"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "data" / "pipeline_baseline.json"
+STUB_REPLY = "I'm here with you. Tell me a little more about how you're feeling."
+
+
+def _wav_bytes(samples: np.ndarray, rate: int, channels: int = 1) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1).reshape(-1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def _resampled(samples: np.ndarray, rate: int) -> np.ndarray:
+    positions = np.arange(int(len(samples) * rate / SAMPLE_RATE)) * (SAMPLE_RATE / rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def build_clips() -> dict[str, bytes]:
+    """The testing_data WAVs plus synthetic variants, deterministic across runs."""
+    clips = {path.name: path.read_bytes() for path in sorted(TESTING_DATA.glob("*.wav"))}
+    if not clips:
+        raise SystemExit(f"No WAV files found in {TESTING_DATA}")
+    decoded = [decode_audio(audio) for audio in clips.values()]
+    first = decoded[0]
+    gap = np.zeros(SAMPLE_RATE // 2, dtype=np.float32)
+    clips["synthetic-silence-5s.wav"] = _wav_bytes(np.zeros(5 * SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+    clips["synthetic-concatenated.wav"] = _wav_bytes(
+        np.concatenate([part for audio in decoded for part in (audio, gap)]), SAMPLE_RATE
+    )
+    clips["synthetic-8khz.wav"] = _wav_bytes(_resampled(first, 8000), 8000)
+    clips["synthetic-44khz-stereo.wav"] = _wav_bytes(_resampled(first, 44100), 44100, channels=2)
+    return clips
+
+
+def _stub_reply(transcript: str, emotion: str, latency_s: float) -> tuple[str, str]:
+    if not transcript:
+        return "", "voice_empty"
+    time.sleep(latency_s)
+    return STUB_REPLY, "voice_stub"
+
+
+def run_pipeline(audio_bytes: bytes, llm_latency_s: float) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    result = transcribe_audio(audio_bytes)
+    timings["transcribe_ms"] = (time.perf_counter() - start) * 1000
+    transcript = (result.get("text") or "").strip()
+
+    start = time.perf_counter()
+    emotion = classify_emotion(transcript, cache=False) if transcript else "neutral"
+    timings["emotion_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    _stub_reply(transcript, emotion, llm_latency_s)
+    timings["reply_ms"] = (time.perf_counter() - start) * 1000
+    timings["total_ms"] = sum(timings.values())
+    return {"transcript": transcript, "emotion": emotion, **timings}
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def _peak_rss_mb() -> float:
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+    return round(rss_bytes() / 2**20, 1)
+
+
+def benchmark(clips: dict[str, bytes], repeats: int, levels: list[int], llm_latency_s: float) -> dict:
+    durations = {name: len(decode_audio(audio)) / SAMPLE_RATE for name, audio in clips.items()}
+
+    first_name = next(iter(clips))
+    cold = run_pipeline(clips[first_name], llm_latency_s)
+
+    per_clip = {}
+    for name, audio in clips.items():
+        runs = [run_pipeline(audio, llm_latency_s) for _ in range(repeats)]
+        transcribe_ms = statistics.median(r["transcribe_ms"] for r in runs)
+        per_clip[name] = {
+            "duration_s": round(durations[name], 2),
+            "transcript": runs[-1]["transcript"],
+            "emotion": runs[-1]["emotion"],
+            "transcribe_ms_p50": round(transcribe_ms, 1),
+            "emotion_ms_p50": round(statistics.median(r["emotion_ms"] for r in runs), 1),
+            "total_ms_p50": round(statistics.median(r["total_ms"] for r in runs), 1),
+            "rtf": round(transcribe_ms / 1000 / durations[name], 4) if durations[name] else 0.0,
+        }
+
+    concurrency = {}
+    workload = list(clips.values()) * repeats
+    for level in levels:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as executor:
+            results = list(executor.map(lambda audio: run_pipeline(audio, llm_latency_s), workload))
+        elapsed = time.perf_counter() - start
+        latencies = [r["total_ms"] for r in results]
+        concurrency[str(level)] = {
+            "requests": len(results),
+            "throughput_rps": round(len(results) / elapsed, 3),
+            "latency_ms_p50": round(_percentile(latencies, 50), 1),
+            "latency_ms_p95": round(_percentile(latencies, 95), 1),
+        }
+
+    speech = [clip for clip in per_clip.values() if clip["duration_s"] and clip["transcript"]]
+    metrics = {
+        "cold_start_ms": round(cold["total_ms"], 1),
+        "warm_transcribe_ms_p50": round(statistics.median(c["transcribe_ms_p50"] for c in per_clip.values()), 1),
+        "warm_emotion_ms_p50": round(statistics.median(c["emotion_ms_p50"] for c in per_clip.values()), 1),
+        "rtf_mean": round(statistics.mean(c["rtf"] for c in speech), 4) if speech else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    for level, data in concurrency.items():
+        metrics[f"c{level}_throughput_rps"] = data["throughput_rps"]
+        metrics[f"c{level}_latency_ms_p95"] = data["latency_ms_p95"]
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "whisper_model": WHISPER_MODEL_NAME,
+            "quantize": QUANTIZE_MODE,
+            "emotion_engine": EMOTION_ENGINE,
+            "llm_latency_ms": round(llm_latency_s * 1000),
+            "repeats": repeats,
+        },
+        "metrics": metrics,
+        "cold_start": {k: round(v, 1) for k, v in cold.items() if k.endswith("_ms")},
+        "clips": per_clip,
+        "concurrency": concurrency,
+    }
+
+
+def compare(metrics: dict, baseline: dict, threshold: float, rss_threshold: float) -> list[str]:
+    """Metrics that got worse than the baseline by more than the threshold.
+
+    ``*_rps`` metrics regress when they drop. Every other metric (latency,
+    RTF, RSS) regresses when it rises.
+    """
+    regressions = []
+    for key, base in baseline.items():
+        current = metrics.get(key)
+        if current is None or not base:
+            continue
+        limit = rss_threshold if key == "peak_rss_mb" else threshold
+        change = (current - base) / base
+        worse = -change if key.endswith("_rps") else change
+        if worse > limit:
+            regressions.append(f"{key}: {base} -> {current} ({change:+.1%}, limit {limit:.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Voice pipeline benchmark with baseline comparison")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--concurrency", default="1,2,4")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latency of the stubbed Gemini reply")
+    parser.add_argument("--output", default="pipeline_report.json")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--rss-threshold", type=float, default=0.10)
+    parser.add_argument("--write-baseline", action="store_true")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    clips = build_clips()
+    report = benchmark(clips, args.repeats, levels, args.llm_latency_ms / 1000)
+
+    print(f"{'clip':<30}{'audio':>8}{'transcribe':>12}{'emotion':>10}{'RTF':>8}  emotion label")
+    for name, clip in report["clips"].items():
+        print(
+            f"{name:<30}{clip['duration_s']:>7.1f}s{clip['transcribe_ms_p50']:>10.0f}ms"
+            f"{clip['emotion_ms_p50']:>8.0f}ms{clip['rtf']:>8.3f}  {clip['emotion']}"
+        )
+    print(f"\n{'concurrency':<14}{'req/s':>8}{'p50':>10}{'p95':>10}")
+    for level, data in report["concurrency"].items():
+        print(f"{level:<14}{data['throughput_rps']:>8.2f}{data['latency_ms_p50']:>8.0f}ms{data['latency_ms_p95']:>8.0f}ms")
+    print(f"\ncold start {report['metrics']['cold_start_ms']:.0f}ms, peak RSS {report['metrics']['peak_rss_mb']:.0f} MB")
+
+    Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.write_baseline:
+        baseline_path.write_text(json.dumps(report["metrics"], indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}; run with --write-baseline to create one")
+        return
+    regressions = compare(report["metrics"], json.loads(baseline_path.read_text(encoding="utf-8")),
+                          args.threshold, args.rss_threshold)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print("\nno regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
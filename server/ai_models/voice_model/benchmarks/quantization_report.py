@@ -0,0 +1,114 @@
+"""Accuracy-versus-latency report for fp32 and int8 voice models.
+
+Whisper: each clip in testing_data is transcribed in both modes. The fp32
+transcript is the reference, so the int8 word error rate measures
+quantization drift rather than absolute accuracy.
+
+Emotion: ``classify_emotion`` runs over ``benchmarks/data/emotion_labelled.jsonl``
+in both modes and is scored against the labels.
+
+Usage:
+    python benchmarks/quantization_report.py [--modes none,int8] [--json report.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+_PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(_PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PACKAGE_ROOT))
+
+from services.asr_service import load_whisper, transcribe_audio
+from services.emotion_text import classify_emotion, load_emotion_pipeline
+from services.model_registry import rss_bytes, registry
+
+TESTING_DATA = _PACKAGE_ROOT / "testing_data"
+LABELLED_TEXT = Path(__file__).resolve().parent / "data" / "emotion_labelled.jsonl"
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def _run_mode(mode: str) -> dict:
+    registry.register("whisper", partial(load_whisper, mode))
+    registry.register("emotion", partial(load_emotion_pipeline, mode))
+    rss_before = rss_bytes()
+
+    clips = {}
+    for path in sorted(TESTING_DATA.glob("*.wav")):
+        audio_bytes = path.read_bytes()
+        start = time.perf_counter()
+        result = transcribe_audio(audio_bytes, language=None)
+        clips[path.name] = {
+            "text": result["text"].strip(),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    samples = [json.loads(line) for line in LABELLED_TEXT.read_text(encoding="utf-8").splitlines() if line.strip()]
+    correct = 0
+    latencies = []
+    for sample in samples:
+        start = time.perf_counter()
+        predicted = classify_emotion(sample["text"], cache=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += predicted == sample["label"]
+
+    return {
+        "clips": clips,
+        "whisper_latency_ms_median": round(statistics.median(c["latency_ms"] for c in clips.values()), 1),
+        "emotion_accuracy": round(correct / len(samples), 4),
+        "emotion_latency_ms_median": round(statistics.median(latencies), 2),
+        "rss_delta_mb": round(max(0, rss_bytes() - rss_before) / 2**20, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="fp32 vs int8 accuracy/latency report")
+    parser.add_argument("--modes", default="none,int8")
+    parser.add_argument("--json", help="Write the full report to this path")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    report = {mode: _run_mode(mode) for mode in modes}
+
+    reference = report.get("none")
+    if reference:
+        for mode, data in report.items():
+            wers = [
+                word_error_rate(reference["clips"][name]["text"], clip["text"])
+                for name, clip in data["clips"].items()
+            ]
+            data["wer_vs_fp32"] = round(statistics.mean(wers), 4)
+
+    print(f"{'mode':<8}{'whisper p50':>13}{'WER vs fp32':>13}{'emotion acc':>13}{'emotion p50':>13}{'RSS +MB':>10}")
+    for mode, data in report.items():
+        print(
+            f"{mode:<8}{data['whisper_latency_ms_median']:>11.0f}ms"
+            f"{data.get('wer_vs_fp32', float('nan')):>13.3f}"
+            f"{data['emotion_accuracy']:>13.3f}"
+            f"{data['emotion_latency_ms_median']:>11.1f}ms"
+            f"{data['rss_delta_mb']:>10.0f}"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
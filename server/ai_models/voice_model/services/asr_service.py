@@ -1,41 +1,131 @@
-import whisper
-import tempfile
 import os
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+import whisper
+
+from services.audio_decode import decode_audio
+from services.batching import WhisperBatcher
+from services.language_pinning import tracker as language_tracker
+from services.model_registry import registry
+from services.quantization import QUANTIZE_MODE, quantize_whisper_int8
+from services.vad import split_on_pauses, trim_silence
+
+WHISPER_MODEL_NAME = os.getenv("VOICE_WHISPER_MODEL", "small")
+
 
-model = whisper.load_model("small")
+def load_whisper(quantize: str = QUANTIZE_MODE) -> "whisper.Whisper":
+    """Build the Whisper model, int8-quantized on CPU when requested."""
+    if quantize == "int8":
+        return quantize_whisper_int8(whisper.load_model(WHISPER_MODEL_NAME, device="cpu"))
+    return whisper.load_model(WHISPER_MODEL_NAME)
 
 
-def _infer_suffix(audio_bytes: bytes) -> str:
-    """Infer a likely container extension from magic bytes."""
-    if len(audio_bytes) >= 12 and audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
-        return ".wav"
-    if audio_bytes.startswith(b"\x1aE\xdf\xa3"):
-        return ".webm"
-    if len(audio_bytes) >= 8 and audio_bytes[4:8] == b"ftyp":
-        return ".m4a"
-    if audio_bytes.startswith(b"ID3") or audio_bytes[:2] == b"\xff\xfb":
-        return ".mp3"
-    if audio_bytes.startswith(b"OggS"):
-        return ".ogg"
-    return ".bin"
+# Loaded lazily on first use; see services.model_registry.
+registry.register("whisper", load_whisper)
 
-def transcribe_audio(audio_bytes: bytes) -> dict:
+# Micro-batching of concurrent short clips (set VOICE_BATCHING=false to disable).
+_BATCHING_ENABLED = os.getenv("VOICE_BATCHING", "true").lower() == "true"
+_batcher = WhisperBatcher(
+    lambda: registry.acquire("whisper"),
+    window_ms=float(os.getenv("VOICE_BATCH_WINDOW_MS", "25")),
+    max_batch_size=int(os.getenv("VOICE_BATCH_MAX_SIZE", "8")),
+)
+
+# Skip Whisper entirely for silent clips (set VOICE_VAD=false to disable).
+_VAD_ENABLED = os.getenv("VOICE_VAD", "true").lower() == "true"
+
+EMPTY_TRANSCRIPT = {"text": "", "language": "unknown"}
+
+
+def transcribe_audio(
+    audio_bytes: bytes,
+    language: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> dict:
     """Transcribe audio in its original language (no translation).
 
+    The payload is decoded in memory (see ``services.audio_decode``) and then
+    handled by ``transcribe_samples``. ``language`` is an optional Whisper
+    language code hint; ``session_id`` enables per-session language pinning
+    (see ``services.language_pinning``).
+
     Returns a dict with keys:
         text     – transcribed text in the spoken language
         language – ISO-639-1 code detected by Whisper (e.g. 'Hindi', 'Kannada', 'English')
     """
-    suffix = _infer_suffix(audio_bytes)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
-        f.write(audio_bytes)
-        temp_path = f.name
+    return transcribe_samples(decode_audio(audio_bytes), language=language, session_id=session_id)
 
-    try:
+
+def transcribe_samples(
+    audio: np.ndarray,
+    language: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> dict:
+    """Transcribe an already-decoded 16 kHz mono float32 array.
+
+    With VAD enabled, leading/trailing silence is trimmed and a clip with no
+    speech returns ``EMPTY_TRANSCRIPT`` without touching the model. When
+    batching is on, long clips are split at pauses into <=30 s chunks that
+    are decoded together.
+
+    An explicit ``language`` wins; otherwise a language pinned for
+    ``session_id`` is used, and only unpinned clips pay for detection.
+    """
+    if _VAD_ENABLED:
+        audio = trim_silence(audio)
+        if audio.size == 0:
+            return dict(EMPTY_TRANSCRIPT)
+
+    pinned = None if language else language_tracker.pinned(session_id)
+    result = _transcribe(audio, language or pinned)
+    if not language:
+        language_tracker.observe(
+            session_id,
+            result.get("language"),
+            result.get("language_prob"),
+            result.get("avg_logprob"),
+            was_pinned=pinned is not None,
+        )
+    return {"text": result["text"], "language": result.get("language") or "unknown"}
+
+
+def _transcribe(audio: np.ndarray, language: Optional[str]) -> dict:
+    if _BATCHING_ENABLED:
+        if WhisperBatcher.fits_single_window(audio):
+            return _batcher.submit(audio, language)
+        if _VAD_ENABLED:
+            return _merge_chunk_results(_batcher.submit_many(split_on_pauses(audio), language))
+
+    with registry.acquire("whisper") as model:
+        language_prob = None
+        if language is None:
+            # Detect once up front so the probability can drive session pinning.
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels)
+            _, probs = model.detect_language(mel.to(model.device))
+            language = max(probs, key=probs.get)
+            language_prob = probs[language]
         # task="transcribe" keeps original language – faster than translating
-        result = model.transcribe(temp_path, task="transcribe")
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        result = model.transcribe(audio, task="transcribe", language=language)
+
+    segments = result.get("segments") or []
+    return {
+        "text": result["text"],
+        "language": result.get("language", language),
+        "language_prob": language_prob,
+        "avg_logprob": float(np.mean([seg["avg_logprob"] for seg in segments])) if segments else None,
+    }
+
 
-    return {"text": result["text"], "language": result.get("language", "en")}
+def _merge_chunk_results(results: list[dict]) -> dict:
+    texts = [(r.get("text") or "").strip() for r in results]
+    languages = Counter(r.get("language") for r in results if r.get("language"))
+    language_probs = [r["language_prob"] for r in results if r.get("language_prob") is not None]
+    logprobs = [r["avg_logprob"] for r in results if r.get("avg_logprob") is not None]
+    return {
+        "text": " ".join(t for t in texts if t),
+        "language": languages.most_common(1)[0][0] if languages else "unknown",
+        "language_prob": float(np.mean(language_probs)) if language_probs else None,
+        "avg_logprob": float(np.mean(logprobs)) if logprobs else None,
+    }
@@ -0,0 +1,272 @@
+"""In-memory audio decoding into the 16 kHz mono float32 arrays Whisper expects.
+
+WAV and raw PCM bodies are decoded with the standard library and NumPy only.
+Compressed containers (webm/ogg/m4a/mp3) are streamed through ffmpeg over
+stdin/stdout pipes, so no temporary file is ever written. ``StreamDecoder``
+keeps one such ffmpeg process open for a recording that arrives in pieces.
+"""
+from __future__ import annotations
+
+import io
+import subprocess
+import threading
+import wave
+from typing import Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(RuntimeError):
+    """Raised when a payload cannot be decoded into audio samples."""
+
+
+class AudioTooLongError(ValueError):
+    """Raised when a payload is longer than the allowed duration."""
+
+
+def infer_suffix(audio_bytes: bytes) -> str:
+    """Infer a likely container extension from magic bytes."""
+    if len(audio_bytes) >= 12 and audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        return ".wav"
+    if audio_bytes.startswith(b"\x1aE\xdf\xa3"):
+        return ".webm"
+    if len(audio_bytes) >= 8 and audio_bytes[4:8] == b"ftyp":
+        return ".m4a"
+    if audio_bytes.startswith(b"ID3") or audio_bytes[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return ".mp3"
+    if audio_bytes.startswith(b"OggS"):
+        return ".ogg"
+    if audio_bytes.startswith(b"fLaC"):
+        return ".flac"
+    if audio_bytes[:2] in (b"\xff\xf1", b"\xff\xf9"):
+        return ".aac"
+    return ".bin"
+
+
+def needs_ffmpeg(audio_bytes: bytes) -> bool:
+    """Return True when the payload can only be decoded through ffmpeg."""
+    return infer_suffix(audio_bytes) != ".wav"
+
+
+def _pcm_to_float(frames: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 1:
+        data = np.frombuffer(frames, dtype=np.uint8).astype(np.float32)
+        return (data - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        data = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        data = np.where(data >= 1 << 23, data - (1 << 24), data)
+        return data.astype(np.float32) / float(1 << 23)
+    if sample_width == 4:
+        return np.frombuffer(frames, dtype="<i4").astype(np.float32) / float(1 << 31)
+    raise AudioDecodeError(f"Failed to load audio: unsupported sample width {sample_width}")
+
+
+def _to_mono(samples: np.ndarray, channels: int) -> np.ndarray:
+    if channels <= 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1)
+
+
+def _resample(samples: np.ndarray, src_rate: int, dst_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Linear-interpolation resampler with a box pre-filter when downsampling."""
+    if src_rate == dst_rate or samples.size == 0:
+        return samples
+    if src_rate > dst_rate:
+        width = int(round(src_rate / dst_rate))
+        if width > 1:
+            kernel = np.full(width, 1.0 / width, dtype=np.float32)
+            samples = np.convolve(samples, kernel, mode="same")
+    n_out = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _check_duration(seconds: float, max_seconds: Optional[float]) -> None:
+    if max_seconds is not None and seconds > max_seconds:
+        raise AudioTooLongError(f"Audio is longer than the {max_seconds:.0f}s limit")
+
+
+def decode_pcm(
+    pcm_bytes: bytes,
+    sample_rate: int = SAMPLE_RATE,
+    channels: int = 1,
+    sample_width: int = 2,
+    max_seconds: Optional[float] = None,
+) -> np.ndarray:
+    """Decode headerless little-endian PCM into a 16 kHz mono float32 array.
+
+    With ``max_seconds``, longer payloads raise ``AudioTooLongError`` before
+    any samples are converted.
+    """
+    usable = len(pcm_bytes) - len(pcm_bytes) % (sample_width * channels)
+    _check_duration(usable / (sample_width * channels * sample_rate), max_seconds)
+    samples = _pcm_to_float(pcm_bytes[:usable], sample_width)
+    samples = _to_mono(samples, channels)
+    return np.ascontiguousarray(_resample(samples, sample_rate), dtype=np.float32)
+
+
+def decode_wav(audio_bytes: bytes, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Decode an integer-PCM WAV body without leaving the process.
+
+    The duration is checked from the header, before any frames are decoded.
+    """
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            channels = wav.getnchannels()
+            sample_width = wav.getsampwidth()
+            rate = wav.getframerate()
+            _check_duration(wav.getnframes() / rate, max_seconds)
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as exc:
+        raise AudioDecodeError(f"Failed to load audio: {exc}") from exc
+    return decode_pcm(frames, sample_rate=rate, channels=channels, sample_width=sample_width)
+
+
+def _ffmpeg_command(max_seconds: Optional[float], streaming: bool = False) -> list[str]:
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0"]
+    if streaming:
+        # Start decoding from the first few KB and write every packet out at once.
+        cmd += ["-probesize", "32768", "-analyzeduration", "0", "-fflags", "nobuffer"]
+    cmd += [
+        "-i", "pipe:0",
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),
+        "-loglevel", "error",
+    ]
+    if streaming:
+        cmd += ["-flush_packets", "1"]
+    if max_seconds is not None:
+        cmd += ["-t", f"{max_seconds + 1:.3f}"]
+    cmd.append("pipe:1")
+    return cmd
+
+
+def decode_with_ffmpeg_pipe(
+    audio_bytes: bytes, timeout_s: Optional[float] = None, max_seconds: Optional[float] = None
+) -> np.ndarray:
+    """Decode any ffmpeg-supported container through stdin/stdout pipes.
+
+    MP4/M4A files whose ``moov`` atom sits at the end of the file cannot be
+    demuxed from a non-seekable pipe; those surface as ``AudioDecodeError``.
+    ffmpeg is killed after ``timeout_s`` seconds and ``TimeoutError`` is raised.
+    With ``max_seconds``, ffmpeg stops just past the limit and
+    ``AudioTooLongError`` is raised.
+    """
+    try:
+        proc = subprocess.run(_ffmpeg_command(max_seconds), input=audio_bytes, capture_output=True, check=False, timeout=timeout_s)
+    except subprocess.TimeoutExpired as exc:
+        raise TimeoutError(f"ffmpeg decode exceeded {timeout_s:.1f}s") from exc
+    if proc.returncode != 0:
+        detail = proc.stderr.decode("utf-8", errors="ignore").strip()
+        raise AudioDecodeError(f"Failed to load audio: {detail}")
+    _check_duration(len(proc.stdout) / (2 * SAMPLE_RATE), max_seconds)
+    return decode_pcm(proc.stdout)
+
+
+def decode_audio(
+    audio_bytes: bytes, timeout_s: Optional[float] = None, max_seconds: Optional[float] = None
+) -> np.ndarray:
+    """Decode an uploaded payload into a 16 kHz mono float32 array.
+
+    WAV bodies are decoded in memory; float WAVs and every other container go
+    through the ffmpeg pipe decoder. Payloads longer than ``max_seconds``
+    raise ``AudioTooLongError``.
+    """
+    if infer_suffix(audio_bytes) == ".wav":
+        try:
+            return decode_wav(audio_bytes, max_seconds=max_seconds)
+        except AudioDecodeError:
+            pass
+    return decode_with_ffmpeg_pipe(audio_bytes, timeout_s=timeout_s, max_seconds=max_seconds)
+
+
+class StreamDecoder:
+    """One ffmpeg process that decodes a container arriving in pieces.
+
+    The pieces of a MediaRecorder recording cannot be decoded on their own,
+    but ffmpeg reading stdin sees them as one continuous stream, so each
+    byte is decoded once. ``feed`` writes a piece; ``take`` returns the
+    samples decoded since the last call. Output lags input by whatever
+    ffmpeg is still buffering. Reader threads drain stdout and stderr so a
+    full pipe never blocks ``feed``.
+    """
+
+    def __init__(self, max_seconds: Optional[float] = None) -> None:
+        self._proc = subprocess.Popen(
+            _ffmpeg_command(max_seconds, streaming=True),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._lock = threading.Lock()
+        self._pcm = bytearray()
+        self._stderr = bytearray()
+        self._readers = [
+            threading.Thread(target=self._drain, args=(self._proc.stdout, self._pcm, None), daemon=True),
+            threading.Thread(target=self._drain, args=(self._proc.stderr, self._stderr, 4096), daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+
+    def _drain(self, pipe, buffer: bytearray, keep: Optional[int]) -> None:
+        while True:
+            data = pipe.read1(65536)
+            if not data:
+                return
+            with self._lock:
+                buffer.extend(data)
+                if keep is not None and len(buffer) > keep:
+                    del buffer[:-keep]
+
+    def _error(self) -> AudioDecodeError:
+        with self._lock:
+            detail = self._stderr.decode("utf-8", errors="ignore").strip()
+        return AudioDecodeError(f"Failed to load audio: {detail or 'ffmpeg exited'}")
+
+    def feed(self, chunk: bytes) -> None:
+        try:
+            self._proc.stdin.write(chunk)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, ValueError) as exc:
+            raise self._error() from exc
+
+    def take(self) -> np.ndarray:
+        with self._lock:
+            usable = len(self._pcm) - len(self._pcm) % 2
+            pcm = bytes(self._pcm[:usable])
+            del self._pcm[:usable]
+        return decode_pcm(pcm)
+
+    def close(self, timeout_s: Optional[float] = None) -> np.ndarray:
+        """End the input, wait for ffmpeg and return the remaining samples.
+
+        Raises ``TimeoutError`` (ffmpeg is killed) after ``timeout_s``, and
+        ``AudioDecodeError`` if ffmpeg failed.
+        """
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            returncode = self._proc.wait(timeout=timeout_s)
+        except subprocess.TimeoutExpired as exc:
+            self.kill()
+            raise TimeoutError(f"ffmpeg decode exceeded {timeout_s:.1f}s") from exc
+        for reader in self._readers:
+            reader.join()
+        if returncode != 0:
+            raise self._error()
+        return self.take()
+
+    def kill(self) -> None:
+        if self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
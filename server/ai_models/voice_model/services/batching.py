@@ -0,0 +1,144 @@
+"""Micro-batching scheduler for Whisper inference.
+
+Concurrent callers submit decoded audio and block until their own result is
+ready. A single worker thread collects requests for up to ``window_ms`` (or
+until ``max_batch_size`` are queued), stacks their log-mel spectrograms and
+runs the encoder and decoder over the whole batch in one ``whisper.decode``
+call.
+
+Only clips that fit in one 30 s Whisper window are batched; longer clips
+keep using ``model.transcribe`` with its sliding-window decoding.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Optional
+
+import numpy as np
+import torch
+import whisper
+
+
+@dataclass
+class _PendingRequest:
+    audio: np.ndarray
+    language: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Optional[dict] = None
+    error: Optional[BaseException] = None
+
+
+class WhisperBatcher:
+    """Collect concurrent transcription requests and decode them together."""
+
+    def __init__(
+        self,
+        acquire_model: Callable[[], ContextManager["whisper.Whisper"]],
+        window_ms: float = 25.0,
+        max_batch_size: int = 8,
+    ) -> None:
+        self._acquire_model = acquire_model
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @staticmethod
+    def fits_single_window(audio: np.ndarray) -> bool:
+        return len(audio) <= whisper.audio.N_SAMPLES
+
+    def submit(self, audio: np.ndarray, language: Optional[str] = None) -> dict:
+        """Queue ``audio`` for the next batch and wait for its result.
+
+        With ``language`` set, decoding skips language detection.
+        """
+        self._ensure_worker()
+        pending = _PendingRequest(audio=audio, language=language)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def submit_many(self, audios: list[np.ndarray], language: Optional[str] = None) -> list[dict]:
+        """Queue several clips at once so they can share a batch."""
+        self._ensure_worker()
+        pending = [_PendingRequest(audio=audio, language=language) for audio in audios]
+        for item in pending:
+            self._queue.put(item)
+        for item in pending:
+            item.done.wait()
+        for item in pending:
+            if item.error is not None:
+                raise item.error
+        return [item.result for item in pending]
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="whisper-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> list[_PendingRequest]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            # DecodingOptions are per batch, so each language hint is its own group.
+            groups: dict[Optional[str], list[_PendingRequest]] = {}
+            for item in batch:
+                groups.setdefault(item.language, []).append(item)
+            for language, group in groups.items():
+                try:
+                    results = self._decode_batch([item.audio for item in group], language)
+                    for item, result in zip(group, results):
+                        item.result = result
+                except BaseException as exc:  # propagate to every waiting caller
+                    for item in group:
+                        item.error = exc
+                finally:
+                    for item in group:
+                        item.done.set()
+
+    def _decode_batch(self, audios: list[np.ndarray], language: Optional[str] = None) -> list[dict]:
+        with self._acquire_model() as model:
+            mels = [
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels)
+                for audio in audios
+            ]
+            mel_batch = torch.stack(mels).to(model.device)
+            options = whisper.DecodingOptions(
+                task="transcribe",
+                language=language,
+                fp16=model.device.type == "cuda",
+            )
+            with torch.no_grad():
+                decoded = whisper.decode(model, mel_batch, options)
+        return [
+            {
+                "text": item.text,
+                "language": item.language,
+                "language_prob": (item.language_probs or {}).get(item.language),
+                "avg_logprob": item.avg_logprob,
+            }
+            for item in decoded
+        ]
@@ -0,0 +1,64 @@
+"""Request deadlines, per-stage budgets and stage timings.
+
+A request gets one overall deadline. Each stage runs with the smaller of its
+own budget and the time left before the deadline. A slow stage therefore
+eats into the later stages' time and cannot push the request past the
+deadline. A stage that runs out of time can fall back to a cheaper result,
+and ``StageTimer`` records which stages did.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+class Deadline:
+    """Wall-clock deadline ``total_s`` seconds from construction."""
+
+    def __init__(self, total_s: float) -> None:
+        self.total_s = total_s
+        self._start = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def remaining(self) -> float:
+        return max(0.0, self.total_s - self.elapsed())
+
+    def budget(self, stage_s: float) -> float:
+        """Seconds a stage may use: its own budget, capped by what is left."""
+        return min(stage_s, self.remaining())
+
+
+class StageTimer:
+    """Per-stage wall-clock timings and degradations for one request.
+
+    ``observe(stage, seconds)`` is called after each stage, e.g. to feed a
+    metrics histogram.
+    """
+
+    def __init__(self, observe: Optional[Callable[[str, float], None]] = None) -> None:
+        self._observe = observe
+        self._start = time.monotonic()
+        self.timings_ms: dict[str, float] = {}
+        self.degraded: list[str] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self.timings_ms[name] = round(elapsed * 1000, 1)
+            if self._observe is not None:
+                self._observe(name, elapsed)
+
+    def degrade(self, name: str) -> None:
+        self.degraded.append(name)
+
+    def report(self) -> dict:
+        timings = dict(self.timings_ms)
+        timings["total"] = round((time.monotonic() - self._start) * 1000, 1)
+        return {"timings_ms": timings, "degraded": list(self.degraded)}
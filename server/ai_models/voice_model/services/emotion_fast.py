@@ -0,0 +1,110 @@
+"""Single-pass embedding-similarity engine for emotion classification.
+
+The zero-shot cross-encoder runs one NLI forward pass per candidate label,
+i.e. 9 passes per message. This engine embeds each message once with a
+multilingual sentence encoder and compares it with label embeddings computed
+at load time. Each label embedding is the mean of a few prototype sentences.
+
+Cosine similarities go through a softmax with a calibrated temperature and
+per-label biases. That puts the scores on the same scale as the zero-shot
+probabilities, so ``emotion_text``'s thresholds (0.75 / 0.55 / 0.35) map to
+the same labels. ``benchmarks/calibrate_fast_emotion.py`` fits the
+calibration and reports agreement with, and latency against, the zero-shot
+path.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+EMBED_MODEL_NAME = os.getenv(
+    "VOICE_EMOTION_EMBED_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+)
+CALIBRATION_PATH = Path(__file__).resolve().parent / "data" / "emotion_fast_calibration.json"
+
+LABEL_PROTOTYPES = {
+    "joy": ["I feel happy and cheerful.", "This is great, I'm delighted.", "मैं बहुत खुश हूँ।", "ನನಗೆ ತುಂಬಾ ಸಂತೋಷವಾಗಿದೆ."],
+    "love": ["I love them so much.", "I feel loved and cared for.", "मुझे उनसे बहुत प्यार है।", "ನಾನು ಅವರನ್ನು ತುಂಬಾ ಪ್ರೀತಿಸುತ್ತೇನೆ."],
+    "sadness": ["I feel sad and down.", "I keep crying and feel empty.", "मैं बहुत उदास हूँ।", "ನನಗೆ ತುಂಬಾ ದುಃಖವಾಗಿದೆ."],
+    "anger": ["I am so angry right now.", "This makes me furious.", "मुझे बहुत गुस्सा आ रहा है।", "ನನಗೆ ತುಂಬಾ ಕೋಪ ಬರುತ್ತಿದೆ."],
+    "fear": ["I am scared and afraid.", "Something terrible might happen to me.", "मुझे बहुत डर लग रहा है।", "ನನಗೆ ತುಂಬಾ ಭಯವಾಗುತ್ತಿದೆ."],
+    "anxiety": ["I'm anxious and can't stop worrying.", "I feel nervous and stressed.", "मुझे बहुत चिंता हो रही है।", "ನನಗೆ ತುಂಬಾ ಆತಂಕವಾಗುತ್ತಿದೆ."],
+    "surprise": ["Wow, I did not expect that at all.", "That was so surprising.", "मुझे यकीन नहीं हो रहा, यह अचानक हुआ।", "ಇದು ನನಗೆ ಆಶ್ಚರ್ಯವಾಯಿತು."],
+    "disgust": ["That is disgusting.", "I feel sick thinking about it.", "यह बहुत घिनौना है।", "ಅದು ಅಸಹ್ಯಕರವಾಗಿದೆ."],
+    "neutral": ["I went to class today.", "It is an ordinary day.", "मैं आज कॉलेज गया।", "ನಾನು ಇಂದು ಕಾಲೇಜಿಗೆ ಹೋದೆ."],
+}
+
+# Where the fit starts; not a calibration to serve with.
+DEFAULT_CALIBRATION = {"temperature": 0.05, "bias": {}}
+
+
+def load_calibration(path: Path = CALIBRATION_PATH) -> dict:
+    """The fitted calibration; uncalibrated scores do not fit the label thresholds."""
+    if not path.exists():
+        raise FileNotFoundError(
+            f"{path} is missing; fit it with benchmarks/calibrate_fast_emotion.py --write"
+        )
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class EmbeddingEmotionEngine:
+    """Scores texts against precomputed label embeddings with one encoder pass."""
+
+    def __init__(
+        self,
+        labels: Sequence[str],
+        model_name: str = EMBED_MODEL_NAME,
+        calibration: dict | None = None,
+    ) -> None:
+        self.labels = list(labels)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name).eval()
+        calibration = calibration or load_calibration()
+        self.temperature = float(calibration.get("temperature", DEFAULT_CALIBRATION["temperature"]))
+        bias = calibration.get("bias", {})
+        self.bias = np.array([float(bias.get(label, 0.0)) for label in self.labels], dtype=np.float32)
+        self.label_matrix = np.stack([self._label_vector(label) for label in self.labels])
+
+    def _label_vector(self, label: str) -> np.ndarray:
+        vector = self.embed(LABEL_PROTOTYPES[label]).mean(axis=0)
+        return vector / np.linalg.norm(vector)
+
+    def embed(self, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+        """L2-normalized mean-pooled sentence embeddings."""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.zeros((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        with torch.no_grad():
+            for start in range(0, len(order), batch_size):
+                chunk = order[start:start + batch_size]
+                batch = self.tokenizer(
+                    [texts[i] for i in chunk], padding=True, truncation=True, return_tensors="pt"
+                )
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled, dim=-1)
+                out[chunk] = pooled.float().cpu().numpy()
+        return out
+
+    def similarities(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embed(texts) @ self.label_matrix.T
+
+    def scores_from_similarities(self, sims: np.ndarray) -> list[tuple[list[str], list[float]]]:
+        logits = sims / self.temperature + self.bias
+        results = []
+        for row in logits:
+            probs = np.exp(row - row.max())
+            probs /= probs.sum()
+            ranked = list(reversed(probs.argsort()))
+            results.append(([self.labels[i] for i in ranked], [float(probs[i]) for i in ranked]))
+        return results
+
+    def scores(self, texts: Sequence[str]) -> list[tuple[list[str], list[float]]]:
+        """Ranked ``(labels, probabilities)`` per text, like the zero-shot output."""
+        return self.scores_from_similarities(self.similarities(texts))
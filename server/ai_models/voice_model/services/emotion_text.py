@@ -1,80 +1,316 @@
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
 from transformers import pipeline
 
-_zsc = pipeline(
-    "zero-shot-classification",
-    model="MoritzLaurer/multilingual-MiniLMv2-L6-mnli-xnli",
-)
+from services.emotion_fast import CALIBRATION_PATH, EmbeddingEmotionEngine
+from services.keyword_matcher import LexiconFile, Match, normalize_text
+from services.model_registry import registry
+from services.quantization import QUANTIZE_MODE, quantize_linear_int8
+from services.result_cache import TTLCache
+
+EMOTION_MODEL_NAME = "MoritzLaurer/multilingual-MiniLMv2-L6-mnli-xnli"
+
+
+def load_emotion_pipeline(quantize: str = QUANTIZE_MODE):
+    """Build the zero-shot pipeline, int8-quantized on CPU when requested."""
+    if quantize == "int8":
+        zsc = pipeline("zero-shot-classification", model=EMOTION_MODEL_NAME, device=-1)
+        zsc.model = quantize_linear_int8(zsc.model)
+        return zsc
+    return pipeline("zero-shot-classification", model=EMOTION_MODEL_NAME)
+
 
 _CANDIDATE_LABELS = [
     "joy", "love", "sadness", "anger", "fear",
     "anxiety", "surprise", "disgust", "neutral",
 ]
 
-# Suicidal keywords (English + Hindi + Kannada) 
-SUICIDAL_KEYWORDS = {
-    # English
-    "suicide", "dying", "suicidal", "kill myself", "end my life",
-    "end it all", "don't want to live", "don't want to be alive",
-    "don't feel like living", "want to die", "wanna die",
-    "no reason to live", "better off dead", "not worth living",
-    "take my own life", "self-harm", "self harm", "hurt myself",
-    "cutting myself",
-    # Hindi
-    "आत्महत्या", "मरना चाहता हूँ", "मरना चाहती हूँ",
-    "जीना नहीं चाहता", "जीना नहीं चाहती", "मर जाना चाहता हूँ",
-    "मर जाना चाहती हूँ", "खुद को मारना", "जीने का कोई कारण नहीं",
-    "मौत चाहिए", "खुद को नुकसान", "जिंदगी खत्म",
-    # Kannada
-    "ಆತ್ಮಹತ್ಯೆ", "ಸಾಯಬೇಕು", "ಬದುಕಲು ಇಷ್ಟವಿಲ್ಲ",
-    "ನನ್ನನ್ನು ಕೊಲ್ಲಬೇಕು", "ಬದುಕು ಬೇಡ",
-}
-
-# Despair phrases (English + Hindi + Kannada)
-DESPAIR_PHRASES = {
-    # English
-    "no hope", "give up", "can't go on", "pointless",
-    "worthless", "hopeless",
-    # Hindi
-    "कोई उम्मीद नहीं", "हार मान", "बेकार", "निराशा",
-    "कोई आशा नहीं", "जीवन व्यर्थ",
-    # Kannada
-    "ನಿರಾಶೆ", "ಯಾವುದೇ ಭರವಸೆ ಇಲ್ಲ", "ಬಿಟ್ಟುಬಿಡು",
-}
-
-# Loss keywords (English + Hindi + Kannada) 
-LOSS_KEYWORDS = {
-    # English
-    "died", "death", "passed away", "passed-on", "passed on",
-    "funeral", "loss", "grief", "lost my", "heartbroken", "bereavement",
-    # Hindi
-    "मृत्यु", "गुजर गए", "गुजर गयी", "अंतिम संस्कार",
-    "खो दिया", "दुख", "शोक", "दिल टूट गया",
-    # Kannada
-    "ಮರಣ", "ಸತ್ತರು", "ಕಳೆದುಕೊಂಡೆ", "ದುಃಖ", "ಅಂತ್ಯಸಂಸ್ಕಾರ",
-}
-
-
-def classify_emotion(text: str) -> str:
+# "zeroshot" (NLI cross-encoder, one pass per label) or "embedding"
+# (one encoder pass per message; see services.emotion_fast).
+EMOTION_ENGINES = ("zeroshot", "embedding")
+EMOTION_ENGINE = os.getenv("VOICE_EMOTION_ENGINE", "zeroshot").strip().lower()
+if EMOTION_ENGINE not in EMOTION_ENGINES:
+    raise ValueError(f"VOICE_EMOTION_ENGINE must be one of {EMOTION_ENGINES}, got {EMOTION_ENGINE!r}")
+if EMOTION_ENGINE == "embedding" and not CALIBRATION_PATH.exists():
+    # Uncalibrated similarities do not fit the label thresholds, so keep the
+    # zero-shot engine until the calibration has been fitted.
+    print(
+        f"[emotion] VOICE_EMOTION_ENGINE=embedding needs {CALIBRATION_PATH}; using zeroshot. "
+        "Fit it with: python benchmarks/calibrate_fast_emotion.py --write"
+    )
+    EMOTION_ENGINE = "zeroshot"
+
+# Loaded lazily on first use; see services.model_registry.
+registry.register("emotion", load_emotion_pipeline)
+registry.register("emotion_embedding", lambda: EmbeddingEmotionEngine(_CANDIDATE_LABELS))
+
+# Same hypothesis the zero-shot pipeline builds for each candidate label.
+_HYPOTHESIS_TEMPLATE = "This example is {}."
+
+# Risk lexicons (English + Hindi + Kannada): categories "suicidal", "despair"
+# and "loss". Edits to the JSON file are picked up without a restart.
+RISK_LEXICON_PATH = os.getenv(
+    "VOICE_RISK_LEXICON", str(Path(__file__).resolve().parent / "data" / "risk_lexicon.json")
+)
+risk_lexicon = LexiconFile(RISK_LEXICON_PATH)
+
+# Memoized labels for repeated short messages ("I'm fine", "no hope", ...).
+# The key includes the lexicon version and the engine, so a rule edit or an
+# engine switch never serves a label computed under different rules.
+# "Suicidal" is never cached, whether it came from the keyword check (which
+# runs before the lookup) or from the scores, so risky input is always
+# scored afresh.
+emotion_cache = TTLCache(
+    max_size=int(os.getenv("VOICE_EMOTION_CACHE_SIZE", "4096")),
+    ttl_s=float(os.getenv("VOICE_EMOTION_CACHE_TTL", "3600")),
+)
+
+
+# Long-input mode. Transcripts longer than LONG_INPUT_CHARS are split into
+# sentence-aware windows of at most WINDOW_CHARS, instead of letting the model
+# silently truncate them. Windows are scored a few at a time. Scoring stops
+# at the first window with a confident negative label, and at most
+# MAX_WINDOWS windows (evenly spaced) are scored. That bounds the latency
+# however long the input is.
+LONG_INPUT_CHARS = int(os.getenv("VOICE_EMOTION_LONG_CHARS", "800"))
+WINDOW_CHARS = int(os.getenv("VOICE_EMOTION_WINDOW_CHARS", "400"))
+MAX_WINDOWS = int(os.getenv("VOICE_EMOTION_MAX_WINDOWS", "12"))
+# "max": the most negative window decides; "mean": length-weighted mean.
+WINDOW_POLICIES = ("max", "mean")
+WINDOW_POLICY = os.getenv("VOICE_EMOTION_WINDOW_POLICY", "max").strip().lower()
+if WINDOW_POLICY not in WINDOW_POLICIES:
+    raise ValueError(f"VOICE_EMOTION_WINDOW_POLICY must be one of {WINDOW_POLICIES}, got {WINDOW_POLICY!r}")
+EARLY_STOP_SCORE = 0.75
+_WINDOWS_PER_ROUND = 4
+_NEGATIVE_LABELS = ("sadness", "disgust", "anger", "fear", "anxiety")
+# Latin and Indic sentence ends (danda / double danda), or line breaks.
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?\u0964\u0965])\s+|\n+")
+
+
+def _cache_key(text: str) -> tuple[str, str, str]:
+    return (risk_lexicon.version, EMOTION_ENGINE, normalize_text(text))
+
+
+def find_risk_matches(text: str) -> list[Match]:
+    """Every risk-lexicon phrase found in ``text``, with its category."""
+    return risk_lexicon.matcher.find_all(text)
+
+
+def classify_emotion_keywords(text: str) -> str:
+    """Lexicon-only label, for when there is no time left to run the model.
+
+    The Suicidal keyword rule still applies. Despair and loss phrases map to
+    "sad", and anything else to "neutral".
+    """
+    risk = risk_lexicon.matcher.matched_categories(text or "")
+    if "suicidal" in risk:
+        return "Suicidal"
+    if "despair" in risk or "loss" in risk:
+        return "sad"
+    return "neutral"
+
+
+def classify_emotion(text: str, cache: bool = True) -> str:
     """Return a coarse emotion label; works on Hindi, Kannada, English, etc."""
     if not text or not text.strip():
         return "Neutral"
 
-    text_l = text.lower()
+    # One pass over the text finds every lexicon category.
+    risk = risk_lexicon.matcher.matched_categories(text)
 
     # Suicidal detection (highest priority) 
-    if any(kw in text_l for kw in SUICIDAL_KEYWORDS):
+    if "suicidal" in risk:
         return "Suicidal"
 
-    #  Zero-shot multilingual emotion classification
-    result = _zsc(text, _CANDIDATE_LABELS, multi_label=False)
-    label_scores = dict(zip(result["labels"], result["scores"]))
+    long_input = len(text) > LONG_INPUT_CHARS
+    key = _cache_key(text) if cache and not long_input else None
+    if key is not None:
+        cached = emotion_cache.get(key)
+        if cached is not None:
+            return cached
+
+    if long_input:
+        label = _label_from_scores(risk, *_long_text_scores(text))
+    elif EMOTION_ENGINE == "embedding":
+        with registry.acquire("emotion_embedding") as engine:
+            labels, scores = engine.scores([text])[0]
+        label = _label_from_scores(risk, labels, scores)
+    else:
+        #  Zero-shot multilingual emotion classification
+        with registry.acquire("emotion") as zsc:
+            result = zsc(text, _CANDIDATE_LABELS, multi_label=False)
+        label = _label_from_scores(risk, result["labels"], result["scores"])
+
+    if key is not None and label != "Suicidal":
+        emotion_cache.set(key, label)
+    return label
+
+
+def classify_emotions(texts: list[str], batch_size: int = 64, cache: bool = True) -> list[str]:
+    """Batch version of ``classify_emotion``; returns labels in input order.
+
+    Every (text, candidate label) NLI pair from every message goes into one
+    pool. The pool is sorted by token length so each padded batch holds
+    similar lengths, and run through the cross-encoder ``batch_size`` pairs
+    at a time. The per-message scores, keyword rules and cache are the same
+    as in the single-item path. Long transcripts go through the windowed
+    long-input mode one at a time.
+    """
+    labels: list[Optional[str]] = [None] * len(texts)
+    risks: dict[int, dict] = {}
+    keys: dict[int, tuple] = {}
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            labels[i] = "Neutral"
+            continue
+        risks[i] = risk_lexicon.matcher.matched_categories(text)
+        if "suicidal" in risks[i]:
+            labels[i] = "Suicidal"
+        elif len(text) > LONG_INPUT_CHARS:
+            labels[i] = _label_from_scores(risks[i], *_long_text_scores(text, batch_size=batch_size))
+        elif cache:
+            keys[i] = _cache_key(text)
+            labels[i] = emotion_cache.get(keys[i])
+
+    pending = [i for i, label in enumerate(labels) if label is None]
+    if pending:
+        scored = _score_texts([texts[i] for i in pending], batch_size)
+        for i, (ranked_labels, ranked_scores) in zip(pending, scored):
+            labels[i] = _label_from_scores(risks[i], ranked_labels, ranked_scores)
+            if i in keys and labels[i] != "Suicidal":
+                emotion_cache.set(keys[i], labels[i])
+    return labels
+
+
+def _score_texts(texts: list[str], batch_size: int = 64) -> list[tuple[list[str], list[float]]]:
+    """Ranked label scores for each text from the configured engine."""
+    if EMOTION_ENGINE == "embedding":
+        with registry.acquire("emotion_embedding") as engine:
+            return engine.scores(texts)
+    with registry.acquire("emotion") as zsc:
+        return _zero_shot_scores(zsc, texts, batch_size)
+
+
+def _pack(pieces: list[str], max_chars: int) -> list[str]:
+    packed: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            packed.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        packed.append(current)
+    return packed
+
+
+def split_windows(text: str, max_chars: int = WINDOW_CHARS) -> list[str]:
+    """Pack whole sentences into windows of at most ``max_chars`` characters.
+
+    A sentence longer than ``max_chars`` is split at word boundaries.
+    """
+    pieces: list[str] = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        sentence = " ".join(sentence.split())
+        if len(sentence) > max_chars:
+            pieces.extend(_pack(sentence.split(), max_chars))
+        elif sentence:
+            pieces.append(sentence)
+    return _pack(pieces, max_chars)
+
+
+def _confident_negative(labels: list[str], scores: list[float]) -> bool:
+    return labels[0] in _NEGATIVE_LABELS and scores[0] >= EARLY_STOP_SCORE
+
+
+def _long_text_scores(
+    text: str, policy: str = WINDOW_POLICY, batch_size: int = 64
+) -> tuple[list[str], list[float]]:
+    """Aggregate ranked scores over the windows of a long transcript."""
+    windows = split_windows(text)
+    if len(windows) > MAX_WINDOWS:
+        keep = sorted(set(np.linspace(0, len(windows) - 1, MAX_WINDOWS).round().astype(int)))
+        windows = [windows[i] for i in keep]
+
+    scored: list[tuple[str, tuple[list[str], list[float]]]] = []
+    for start in range(0, len(windows), _WINDOWS_PER_ROUND):
+        chunk = windows[start:start + _WINDOWS_PER_ROUND]
+        for window, ranked in zip(chunk, _score_texts(chunk, batch_size)):
+            if _confident_negative(*ranked):
+                # A confident negative window settles the label.
+                return ranked
+            scored.append((window, ranked))
+
+    if policy == "mean":
+        total = np.zeros(len(_CANDIDATE_LABELS))
+        for window, (labels, scores) in scored:
+            by_label = dict(zip(labels, scores))
+            total += len(window) * np.array([by_label[label] for label in _CANDIDATE_LABELS])
+        total /= total.sum()
+        ranked = list(reversed(total.argsort()))
+        return [_CANDIDATE_LABELS[i] for i in ranked], [float(total[i]) for i in ranked]
+
+    def negativity(item) -> float:
+        labels, scores = item[1]
+        by_label = dict(zip(labels, scores))
+        return max(by_label.get(label, 0.0) for label in _NEGATIVE_LABELS)
+
+    return max(scored, key=negativity)[1]
+
+
+def _entailment_id(config) -> int:
+    for label, idx in config.label2id.items():
+        if label.lower().startswith("entail"):
+            return idx
+    return -1
+
+
+def _zero_shot_scores(zsc, texts: list[str], batch_size: int) -> list[tuple[list[str], list[float]]]:
+    """Single-label zero-shot scores for many texts, ranked like the pipeline's."""
+    tokenizer, model = zsc.tokenizer, zsc.model
+    n_labels = len(_CANDIDATE_LABELS)
+    hypotheses = [_HYPOTHESIS_TEMPLATE.format(label) for label in _CANDIDATE_LABELS]
+    firsts = [text for text in texts for _ in hypotheses]
+    seconds = hypotheses * len(texts)
+
+    encoded = tokenizer(firsts, seconds, truncation="only_first")
+    order = sorted(range(len(firsts)), key=lambda idx: len(encoded["input_ids"][idx]))
+    entail_id = _entailment_id(model.config)
+    entail_logits = np.zeros(len(firsts), dtype=np.float32)
+
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            features = [{key: encoded[key][idx] for key in encoded.keys()} for idx in chunk]
+            batch = tokenizer.pad(features, return_tensors="pt").to(zsc.device)
+            logits = model(**batch).logits
+            entail_logits[chunk] = logits[:, entail_id].float().cpu().numpy()
+
+    results = []
+    for row in entail_logits.reshape(len(texts), n_labels):
+        scores = np.exp(row - row.max())
+        scores /= scores.sum()
+        ranked = list(reversed(scores.argsort()))
+        results.append(([_CANDIDATE_LABELS[i] for i in ranked], [float(scores[i]) for i in ranked]))
+    return results
+
+
+def _label_from_scores(risk: dict, labels: list[str], scores: list[float]) -> str:
+    """Map ranked zero-shot scores plus lexicon matches to the coarse label."""
+    label_scores = dict(zip(labels, scores))
 
-    best_label = result["labels"][0]
-    best_score = result["scores"][0]
+    best_label = labels[0]
+    best_score = scores[0]
 
     # Very high sadness + despair phrasing → Suicidal
     if best_label == "sadness" and best_score >= 0.75:
-        if any(p in text_l for p in DESPAIR_PHRASES):
+        if "despair" in risk:
             return "Suicidal"
 
     # Strong sadness → Depressed
@@ -82,7 +318,7 @@ def classify_emotion(text: str) -> str:
         return "Depressed"
 
     # Loss-related keywords → sad
-    if any(kw in text_l for kw in LOSS_KEYWORDS):
+    if "loss" in risk:
         return "sad"
 
     # Negative emotions above threshold → sad
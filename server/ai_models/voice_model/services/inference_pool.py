@@ -0,0 +1,172 @@
+"""Bounded worker tier for CPU-heavy inference with admission control.
+
+A fixed number of worker threads run inference. Up to ``max_queue`` more
+requests may wait for a worker. Once that is full, ``run`` raises
+``PoolFullError`` straight away instead of letting every request slow down.
+A request that waits longer than ``queue_timeout_s`` is dropped before it
+starts and raises ``QueueTimeoutError``. Both errors carry a
+``retry_after_s`` hint estimated from recent service times.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional
+
+# Returned by a task that was dropped for waiting past its deadline.
+_EXPIRED = object()
+
+
+class PoolRejectedError(RuntimeError):
+    """Base class for requests the pool refused to run."""
+
+    def __init__(self, message: str, retry_after_s: int) -> None:
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+class PoolFullError(PoolRejectedError):
+    """All workers are busy and the wait queue is full."""
+
+
+class QueueTimeoutError(PoolRejectedError):
+    """The request waited in the queue past its deadline."""
+
+
+class InferencePool:
+    """Fixed-size worker pool with a bounded wait queue and queue deadline."""
+
+    def __init__(self, workers: int = 4, max_queue: int = 16, queue_timeout_s: float = 10.0) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._waits_ms: deque[float] = deque(maxlen=512)
+        self._service_ms: deque[float] = deque(maxlen=512)
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.overran = 0
+
+    def _retry_after(self) -> int:
+        with self._lock:
+            service_s = (sum(self._service_ms) / len(self._service_ms) / 1000) if self._service_ms else 1.0
+            queued = max(0, self._admitted - self._running)
+        return max(1, math.ceil(service_s * (queued + 1) / self.workers))
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn`` on a worker and return its result, or reject fast."""
+        return self.run_with_timeout(None, fn, *args, **kwargs)
+
+    def run_with_timeout(self, timeout_s: Optional[float], fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Like ``run``, but give up once ``timeout_s`` seconds have passed in total.
+
+        The queue wait is capped by ``timeout_s`` as well as ``queue_timeout_s``.
+        A task that starts but overruns raises ``TimeoutError``. It keeps its
+        worker (and its admission slot) until it finishes, and its result is
+        discarded. A wait cut short by ``timeout_s`` rather than
+        ``queue_timeout_s`` also raises ``TimeoutError``, and a ``timeout_s``
+        that is already spent raises it without queueing.
+        """
+        if timeout_s is not None and timeout_s <= 0:
+            raise TimeoutError("No time left for this stage")
+        with self._lock:
+            if self._admitted >= self.workers + self.max_queue:
+                self.rejected += 1
+                full = True
+            else:
+                self._admitted += 1
+                full = False
+        if full:
+            raise PoolFullError("Inference queue is full", self._retry_after())
+
+        enqueued = time.monotonic()
+        queue_limit = self.queue_timeout_s if timeout_s is None else min(self.queue_timeout_s, timeout_s)
+        started_event = threading.Event()
+        abandoned = threading.Event()
+
+        def _task() -> Any:
+            waited = time.monotonic() - enqueued
+            with self._lock:
+                if abandoned.is_set() or waited > queue_limit:
+                    # Its wait is recorded by the caller.
+                    return _EXPIRED
+                self._waits_ms.append(waited * 1000)
+                self._running += 1
+                started_event.set()
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self.completed += 1
+                    self._service_ms.append((time.monotonic() - started) * 1000)
+
+        overran = False
+        try:
+            future = self._executor.submit(_task)
+            if not started_event.wait(queue_limit):
+                with self._lock:
+                    # The task may have started between the timeout and this lock.
+                    if not started_event.is_set():
+                        abandoned.set()
+                        future.cancel()
+            if abandoned.is_set():
+                result = _EXPIRED
+            else:
+                remaining = None if timeout_s is None else max(0.0, timeout_s - (time.monotonic() - enqueued))
+                try:
+                    result = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    overran = True
+        finally:
+            if overran:
+                future.add_done_callback(lambda _: self._release())
+            else:
+                self._release()
+        if overran:
+            with self._lock:
+                self.overran += 1
+            raise TimeoutError(f"Inference did not finish within {timeout_s:.1f}s")
+        if result is _EXPIRED:
+            with self._lock:
+                # Waits that ended in a timeout count too, or the percentiles
+                # would only describe the requests that got lucky.
+                self._waits_ms.append((time.monotonic() - enqueued) * 1000)
+                self.timed_out += 1
+            if queue_limit < self.queue_timeout_s:
+                # The request deadline ran out first, not the queue's own limit.
+                raise TimeoutError(f"Inference did not start within {timeout_s:.1f}s")
+            raise QueueTimeoutError("Request waited too long for an inference worker", self._retry_after())
+        return result
+
+    def _release(self) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_timeout_s": self.queue_timeout_s,
+                "running": self._running,
+                "queue_depth": max(0, self._admitted - self._running),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "overran": self.overran,
+                "wait_ms_p50": round(waits[len(waits) // 2], 1) if waits else 0.0,
+                "wait_ms_p95": round(waits[int(len(waits) * 0.95)], 1) if waits else 0.0,
+                "wait_ms_max": round(waits[-1], 1) if waits else 0.0,
+            }
+
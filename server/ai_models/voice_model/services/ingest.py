@@ -0,0 +1,77 @@
+"""Bounded, early-rejecting reads of uploaded audio.
+
+The body is read from the request stream in chunks into a single buffer.
+- A declared ``Content-Length`` over the limit is rejected before anything
+  is read.
+- A body that grows past the limit is rejected as soon as it does.
+- The container is identified from the magic bytes of the first chunk, and
+  an unsupported container is rejected before the rest is buffered.
+"""
+from __future__ import annotations
+
+import os
+from typing import BinaryIO, Optional
+
+from services.audio_decode import infer_suffix
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("VOICE_MAX_UPLOAD_MB", "25")) * 2**20)
+MAX_AUDIO_SECONDS = float(os.getenv("VOICE_MAX_AUDIO_SECONDS", "600"))
+SUPPORTED_SUFFIXES = (".wav", ".webm", ".m4a", ".mp3", ".ogg", ".flac", ".aac")
+
+_SNIFF_BYTES = 12
+_CHUNK_BYTES = 64 * 1024
+
+
+class UploadRejectedError(ValueError):
+    """An upload refused before decoding; ``status_code`` is the HTTP status."""
+
+    status_code = 400
+
+
+class UploadTooLargeError(UploadRejectedError):
+    status_code = 413
+
+
+class UnsupportedMediaError(UploadRejectedError):
+    status_code = 415
+
+
+def check_container(head: bytes) -> str:
+    """Return the container suffix for ``head`` or raise ``UnsupportedMediaError``."""
+    suffix = infer_suffix(bytes(head[:_SNIFF_BYTES]))
+    if suffix not in SUPPORTED_SUFFIXES:
+        raise UnsupportedMediaError(
+            "Unsupported audio container; send WAV, WebM, Ogg, MP3, M4A, FLAC or AAC."
+        )
+    return suffix
+
+
+def read_upload(
+    stream: BinaryIO,
+    content_length: Optional[int] = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    sniff: bool = True,
+) -> bytearray:
+    """Read at most ``max_bytes`` from ``stream``, rejecting as early as possible.
+
+    With ``sniff`` the first bytes must be a supported container. The read
+    buffer itself is returned, so the upload is never copied.
+    """
+    if content_length is not None and content_length > max_bytes:
+        raise UploadTooLargeError(f"Upload is larger than the {max_bytes // 2**20} MB limit")
+
+    buffer = bytearray()
+    checked = not sniff
+    while True:
+        chunk = stream.read(_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise UploadTooLargeError(f"Upload is larger than the {max_bytes // 2**20} MB limit")
+        if not checked and len(buffer) >= _SNIFF_BYTES:
+            check_container(buffer)
+            checked = True
+    if buffer and not checked:
+        check_container(buffer)
+    return buffer
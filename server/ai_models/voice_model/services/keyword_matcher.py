@@ -0,0 +1,243 @@
+"""Compiled, single-pass multilingual phrase matcher for risk lexicons.
+
+All phrases of all categories are compiled into one Aho-Corasick automaton,
+so a transcript is scanned once no matter how many phrases there are. The C
+automaton from ``pyahocorasick`` is used when it is installed. Otherwise an
+equivalent pure-Python automaton is built, which gives the same matches but
+runs slower.
+
+Text and phrases are normalized the same way: Unicode NFC, case folding,
+curly apostrophes made straight, and whitespace runs collapsed. NFC over a
+whole Devanagari or Kannada transcript costs more than the scan itself, so
+it is applied per word through a cache; transcripts repeat their words.
+Boundaries depend on the script:
+- Every match must start at a word boundary, so "loss" no longer matches
+  inside "glossy".
+- Latin-script phrases must end at a word boundary or continue with one
+  inflection suffix and then a boundary, so "self-harm" matches
+  "self-harming" and "hopeless" matches "hopelessness".
+- Indic phrases (Devanagari, Kannada, ...) may be followed by inflection
+  suffixes and vowel signs, so "दुख" matches "दुखी" and "ದುಃಖ" matches
+  "ದುಃಖಿತ". They must not end right before a virama or nukta, which would
+  make their last letter part of a different one.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional
+
+try:
+    import ahocorasick
+except ImportError:  # pure-Python automaton below
+    ahocorasick = None
+
+
+# Endings a Latin phrase may take before the word boundary.
+LATIN_SUFFIXES = frozenset({"s", "es", "d", "ed", "ing", "ness", "ly"})
+
+
+@lru_cache(maxsize=65536)
+def _normalize_word(word: str) -> str:
+    word = unicodedata.normalize("NFC", word).casefold()
+    return word.replace("’", "'").replace("‘", "'")
+
+
+def normalize_text(text: str) -> str:
+    if text.isascii():
+        return " ".join(text.lower().split())
+    # NFC never composes across whitespace, so per-word results join up the same.
+    return " ".join(map(_normalize_word, text.split()))
+
+
+def _is_word_char(ch: str) -> bool:
+    return unicodedata.category(ch)[0] in ("L", "M", "N")
+
+
+def _joins_previous(ch: str) -> bool:
+    # Nukta (7) and virama (9) change or fuse the letter before them.
+    return unicodedata.combining(ch) in (7, 9)
+
+
+def _is_latin_phrase(phrase: str) -> bool:
+    for ch in phrase:
+        if unicodedata.category(ch)[0] == "L":
+            return "LATIN" in unicodedata.name(ch, "")
+    return True
+
+
+@dataclass(frozen=True)
+class Match:
+    category: str
+    phrase: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over ``{category: phrases}``."""
+
+    def __init__(self, lexicon: Mapping[str, Iterable[str]], use_c_automaton: bool = True) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        # (category, phrase, length, latin)
+        self._patterns: list[tuple[str, str, int, bool]] = []
+        self.categories = tuple(lexicon)
+        self._automaton = None
+
+        for category, phrases in lexicon.items():
+            for raw in phrases:
+                phrase = normalize_text(raw)
+                if phrase:
+                    self._patterns.append((category, phrase, len(phrase), _is_latin_phrase(phrase)))
+
+        if use_c_automaton and ahocorasick is not None and self._patterns:
+            # The C automaton stores one value per key, so keep every index for the phrase.
+            by_phrase: dict[str, list[int]] = {}
+            for idx, (_, phrase, _, _) in enumerate(self._patterns):
+                by_phrase.setdefault(phrase, []).append(idx)
+            self._automaton = ahocorasick.Automaton()
+            for phrase, indexes in by_phrase.items():
+                self._automaton.add_word(phrase, tuple(indexes))
+            self._automaton.make_automaton()
+        else:
+            for idx, (_, phrase, _, _) in enumerate(self._patterns):
+                self._add(idx, phrase)
+            self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def backend(self) -> str:
+        return "pyahocorasick" if self._automaton is not None else "python"
+
+    def _add(self, idx: int, phrase: str) -> None:
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(idx)
+
+    def _build_failure_links(self) -> None:
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                state = self._fail[node]
+                while state and ch not in self._goto[state]:
+                    state = self._fail[state]
+                fallback = self._goto[state].get(ch, 0)
+                self._fail[child] = fallback if fallback != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _bounded(self, text: str, start: int, end: int, latin: bool) -> bool:
+        if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+            return False
+        if end < len(text):
+            following = text[end]
+            if latin:
+                if not (_is_word_char(following) and _is_word_char(text[end - 1])):
+                    return True
+                tail_end = end
+                while tail_end < len(text) and _is_word_char(text[tail_end]):
+                    tail_end += 1
+                return text[end:tail_end] in LATIN_SUFFIXES
+            return not _joins_previous(following)
+        return True
+
+    def _candidates(self, normalized: str) -> Iterator[tuple[int, int]]:
+        """Yield ``(end_index_inclusive, pattern_index)`` for raw occurrences."""
+        if self._automaton is not None:
+            for end, indexes in self._automaton.iter(normalized):
+                for idx in indexes:
+                    yield end, idx
+            return
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, ch in enumerate(normalized):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                yield i, idx
+
+    def _scan(self, normalized: str) -> Iterator[Match]:
+        for last, idx in self._candidates(normalized):
+            category, phrase, length, latin = self._patterns[idx]
+            start = last + 1 - length
+            if self._bounded(normalized, start, last + 1, latin):
+                yield Match(category, phrase, start, last + 1)
+
+    def find_all(self, text: str) -> list[Match]:
+        """Every bounded match, in order of where it ends in the normalized text."""
+        return list(self._scan(normalize_text(text)))
+
+    def matched_categories(self, text: str) -> dict[str, Match]:
+        """First match per category (a single scan covers every category)."""
+        found: dict[str, Match] = {}
+        for match in self._scan(normalize_text(text)):
+            found.setdefault(match.category, match)
+        return found
+
+
+class LexiconFile:
+    """A ``KeywordMatcher`` built from a JSON file and reloaded when it changes.
+
+    The file maps category names to phrase lists. Its modification time is
+    checked at most every ``check_interval_s`` seconds. ``version`` is a
+    content hash, so callers can tie cached decisions to a rule version.
+    """
+
+    def __init__(self, path: os.PathLike | str, check_interval_s: float = 5.0) -> None:
+        self.path = Path(path)
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.version = ""
+        self.lexicon: dict[str, list[str]] = {}
+        self._matcher = KeywordMatcher({})
+        self.reload()
+
+    def reload(self) -> None:
+        raw = self.path.read_bytes()
+        lexicon = json.loads(raw.decode("utf-8"))
+        matcher = KeywordMatcher(lexicon)
+        with self._lock:
+            self.lexicon = lexicon
+            self._matcher = matcher
+            self._mtime = self.path.stat().st_mtime
+            self.version = hashlib.sha256(raw).hexdigest()[:12]
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval_s:
+            return
+        self._checked_at = now
+        try:
+            changed = self.path.stat().st_mtime != self._mtime
+            if changed:
+                self.reload()
+        except (OSError, ValueError) as exc:
+            # Keep serving the last good lexicon if the file is mid-edit or invalid.
+            print(f"[lexicon] reload of {self.path} failed: {exc}")
+
+    @property
+    def matcher(self) -> KeywordMatcher:
+        self._maybe_reload()
+        return self._matcher
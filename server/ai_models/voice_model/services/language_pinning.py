@@ -0,0 +1,97 @@
+"""Per-session language pinning so Whisper can skip language detection.
+
+Users almost always keep speaking one language for a whole session. After a
+clip is detected with probability >= ``pin_threshold``, that language is
+pinned for the session and later clips are decoded with it directly. If a
+pinned clip decodes with an average log-probability below
+``unpin_logprob``, the user has probably switched language. The pin is then
+dropped and the next clip is detected again.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional
+
+from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+
+from services.result_cache import TTLCache
+
+
+def normalize_language(hint: Optional[str]) -> Optional[str]:
+    """Map a code ("hi") or English name ("Hindi") to a Whisper language code.
+
+    Raises ``ValueError`` for languages Whisper does not know.
+    """
+    if hint is None or not hint.strip():
+        return None
+    value = hint.strip().lower()
+    if value in LANGUAGES:
+        return value
+    if value in TO_LANGUAGE_CODE:
+        return TO_LANGUAGE_CODE[value]
+    raise ValueError(f"Unsupported language: {hint}")
+
+
+class LanguageTracker:
+    """Remembers a confidently detected language per session."""
+
+    def __init__(
+        self,
+        pin_threshold: float = 0.8,
+        unpin_logprob: float = -1.0,
+        max_sessions: int = 10000,
+        ttl_s: float = 6 * 3600,
+    ) -> None:
+        self.pin_threshold = pin_threshold
+        self.unpin_logprob = unpin_logprob
+        self._pins = TTLCache(max_size=max_sessions, ttl_s=ttl_s)
+        self._lock = threading.Lock()
+        self.pinned_decodes = 0
+        self.detections = 0
+        self.unpins = 0
+
+    def pinned(self, session_id: Optional[str]) -> Optional[str]:
+        if not session_id:
+            return None
+        return self._pins.get(session_id)
+
+    def observe(
+        self,
+        session_id: Optional[str],
+        language: Optional[str],
+        language_prob: Optional[float],
+        avg_logprob: Optional[float],
+        was_pinned: bool,
+    ) -> None:
+        """Update the session's pin from one decoded clip."""
+        with self._lock:
+            if was_pinned:
+                self.pinned_decodes += 1
+            else:
+                self.detections += 1
+        if not session_id or not language:
+            return
+        if was_pinned:
+            if avg_logprob is not None and avg_logprob < self.unpin_logprob:
+                self._pins.set(session_id, None)
+                with self._lock:
+                    self.unpins += 1
+            return
+        if language_prob is not None and language_prob >= self.pin_threshold:
+            self._pins.set(session_id, language)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": self._pins.stats()["size"],
+                "pinned_decodes": self.pinned_decodes,
+                "detections": self.detections,
+                "unpins": self.unpins,
+            }
+
+
+tracker = LanguageTracker(
+    pin_threshold=float(os.getenv("VOICE_LANGUAGE_PIN_THRESHOLD", "0.8")),
+    unpin_logprob=float(os.getenv("VOICE_LANGUAGE_UNPIN_LOGPROB", "-1.0")),
+)
@@ -0,0 +1,185 @@
+"""Lazy, idle-evictable model residency for the voice service.
+
+Models are registered with a zero-argument loader and only built the first
+time ``acquire`` is used. Each load records its wall time and the change in
+process RSS. With ``idle_ttl_s`` > 0 a background reaper drops models that
+have not been used for that long. The next request loads them again.
+"""
+from __future__ import annotations
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process, or 0 when unavailable."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fh:
+            resident_pages = int(fh.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+
+        # ru_maxrss is a high-water mark (KiB on Linux) – the best we can do here.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+class _ModelSlot:
+    def __init__(self, name: str, loader: Callable[[], Any]) -> None:
+        self.name = name
+        self.loader = loader
+        self.model: Any = None
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.last_used = 0.0
+        self.load_seconds: Optional[float] = None
+        self.rss_delta_bytes: Optional[int] = None
+        self.loads = 0
+        self.evictions = 0
+
+
+class ModelRegistry:
+    """Registry of lazily loaded models with optional idle-TTL eviction."""
+
+    def __init__(self, idle_ttl_s: float = 0.0) -> None:
+        self.idle_ttl_s = idle_ttl_s
+        self._slots: dict[str, _ModelSlot] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_lock = threading.Lock()
+        self._warmup_state = "disabled"
+        self._warmup_error: Optional[str] = None
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        self._slots[name] = _ModelSlot(name, loader)
+
+    def _load(self, slot: _ModelSlot) -> None:
+        rss_before = rss_bytes()
+        started = time.perf_counter()
+        slot.model = slot.loader()
+        slot.load_seconds = time.perf_counter() - started
+        slot.rss_delta_bytes = max(0, rss_bytes() - rss_before)
+        slot.loads += 1
+        print(
+            f"[models] loaded '{slot.name}' in {slot.load_seconds:.1f}s "
+            f"(+{slot.rss_delta_bytes / 2**20:.0f} MB RSS)"
+        )
+        self._ensure_reaper()
+
+    @contextmanager
+    def acquire(self, name: str) -> Iterator[Any]:
+        """Yield the named model, loading it first if needed.
+
+        A model is never evicted while it is acquired.
+        """
+        slot = self._slots[name]
+        with slot.lock:
+            if slot.model is None:
+                self._load(slot)
+            slot.in_use += 1
+            model = slot.model
+        try:
+            yield model
+        finally:
+            with slot.lock:
+                slot.in_use -= 1
+                slot.last_used = time.monotonic()
+
+    def is_loaded(self, name: str) -> bool:
+        return self._slots[name].model is not None
+
+    def evict_idle(self) -> list[str]:
+        """Drop every model idle for longer than ``idle_ttl_s``."""
+        if self.idle_ttl_s <= 0:
+            return []
+        evicted = []
+        cutoff = time.monotonic() - self.idle_ttl_s
+        for slot in self._slots.values():
+            with slot.lock:
+                if slot.model is not None and slot.in_use == 0 and slot.last_used < cutoff:
+                    slot.model = None
+                    slot.evictions += 1
+                    evicted.append(slot.name)
+        if evicted:
+            gc.collect()
+            try:
+                import torch
+
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+            print(f"[models] evicted idle models: {', '.join(evicted)}")
+        return evicted
+
+    def _ensure_reaper(self) -> None:
+        if self.idle_ttl_s <= 0:
+            return
+        with self._reaper_lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            interval = min(30.0, max(1.0, self.idle_ttl_s / 4))
+
+            def _reap() -> None:
+                while True:
+                    time.sleep(interval)
+                    self.evict_idle()
+
+            self._reaper = threading.Thread(target=_reap, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    def warm_up(self, fn: Callable[[], Any], background: bool = True) -> None:
+        """Run ``fn`` (typically one inference per model) to preload weights."""
+        self._warmup_state = "running"
+
+        def _run() -> None:
+            try:
+                fn()
+                self._warmup_state = "done"
+            except Exception as exc:
+                self._warmup_error = str(exc)
+                self._warmup_state = "failed"
+                print(f"[models] warm-up failed: {exc}")
+
+        if background:
+            threading.Thread(target=_run, name="model-warmup", daemon=True).start()
+        else:
+            _run()
+
+    @property
+    def ready(self) -> bool:
+        """True once warm-up finished, or immediately when warm-up is disabled."""
+        return self._warmup_state in ("disabled", "done", "failed")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        models = {}
+        for slot in self._slots.values():
+            models[slot.name] = {
+                "loaded": slot.model is not None,
+                "in_use": slot.in_use,
+                "load_seconds": None if slot.load_seconds is None else round(slot.load_seconds, 3),
+                "rss_delta_mb": None
+                if slot.rss_delta_bytes is None
+                else round(slot.rss_delta_bytes / 2**20, 1),
+                "idle_seconds": round(now - slot.last_used, 1) if slot.last_used else None,
+                "loads": slot.loads,
+                "evictions": slot.evictions,
+            }
+        return {
+            "warmup": self._warmup_state,
+            "warmup_error": self._warmup_error,
+            "idle_ttl_s": self.idle_ttl_s,
+            "rss_mb": round(rss_bytes() / 2**20, 1),
+            "models": models,
+        }
+
+
+registry = ModelRegistry(idle_ttl_s=float(os.getenv("VOICE_MODEL_IDLE_TTL", "0")))
@@ -0,0 +1,41 @@
+"""Optional dynamic int8 quantization for CPU inference.
+
+Set ``VOICE_QUANTIZE=int8`` to quantize the ``nn.Linear`` layers of Whisper
+and of the zero-shot emotion model when they are loaded. Weights are stored
+as int8 and activations are quantized on the fly. This cuts model memory
+roughly 4x for those layers and usually speeds up CPU inference, at a small
+cost in accuracy. ``benchmarks/quantization_report.py`` measures the
+trade-off.
+"""
+from __future__ import annotations
+
+import os
+
+import torch
+from torch import nn
+
+QUANTIZE_MODES = ("none", "int8")
+QUANTIZE_MODE = os.getenv("VOICE_QUANTIZE", "none").strip().lower()
+if QUANTIZE_MODE not in QUANTIZE_MODES:
+    raise ValueError(f"VOICE_QUANTIZE must be one of {QUANTIZE_MODES}, got {QUANTIZE_MODE!r}")
+
+
+def quantize_linear_int8(module: nn.Module) -> nn.Module:
+    """Return ``module`` with every exact ``nn.Linear`` dynamically quantized."""
+    module.eval()
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_whisper_int8(model: nn.Module) -> nn.Module:
+    """Dynamically quantize a CPU Whisper model.
+
+    Whisper wraps its projections in a ``whisper.model.Linear`` subclass that
+    only adds dtype casting. ``quantize_dynamic`` matches exact types, so those
+    layers are turned back into plain ``nn.Linear`` first.
+    """
+    from whisper.model import Linear as WhisperLinear
+
+    for submodule in model.modules():
+        if type(submodule) is WhisperLinear:
+            submodule.__class__ = nn.Linear
+    return quantize_linear_int8(model)
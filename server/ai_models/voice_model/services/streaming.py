@@ -0,0 +1,197 @@
+"""Incremental transcription of audio that arrives in chunks.
+
+A ``StreamingSession`` accumulates chunks as they are recorded. Whenever the
+buffered audio contains a finished segment (speech followed by a pause, or a
+full 30 s Whisper window) that segment is transcribed right away and returned
+as a partial transcript. ``finish`` transcribes whatever is left, so only the
+final segment is still outstanding when the user stops talking.
+
+Chunks are either raw little-endian PCM (``format="pcm"``) or successive
+pieces of a single container stream such as MediaRecorder webm/ogg output.
+PCM chunks are decoded once each. A container stream is fed to one ffmpeg
+process per session (``audio_decode.StreamDecoder``), so each byte is
+decoded once too; its samples may come out a chunk or so later. Either way
+only the not yet transcribed audio is kept as samples.
+
+A session is capped like a single upload. A chunk that would take it past
+``max_bytes`` is refused with ``UploadTooLargeError``, and a PCM chunk past
+``max_seconds`` with ``AudioTooLongError``; the session keeps the audio it
+already had. A container stream is cut at ``max_seconds`` instead: the
+chunk that crosses it and every later one raise ``AudioTooLongError``.
+Call ``close`` on a session that is dropped without ``finish``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Optional
+
+import numpy as np
+
+from services.audio_decode import SAMPLE_RATE, AudioTooLongError, StreamDecoder, decode_pcm
+from services.ingest import MAX_AUDIO_SECONDS, MAX_UPLOAD_BYTES, UploadTooLargeError
+from services.vad import FRAME, MAX_CHUNK, last_pause
+
+# How long ``finish`` waits for ffmpeg to flush a container stream.
+FINISH_DECODE_TIMEOUT_S = 10.0
+
+
+class StreamingSession:
+    """Buffered audio plus the partial transcripts produced so far."""
+
+    def __init__(
+        self,
+        transcriber: Callable[[np.ndarray], dict],
+        audio_format: str = "container",
+        sample_rate: int = SAMPLE_RATE,
+        channels: int = 1,
+        max_bytes: int = MAX_UPLOAD_BYTES,
+        max_seconds: Optional[float] = MAX_AUDIO_SECONDS,
+    ) -> None:
+        self.session_id = uuid.uuid4().hex
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.partials: list[dict] = []
+        self.last_activity = time.monotonic()
+        self.received = 0
+        self._transcriber = transcriber
+        # PCM bytes of a frame split across two chunks.
+        self._raw = bytearray()
+        # Opened on the first container chunk.
+        self._decoder: Optional[StreamDecoder] = None
+        self._too_long = False
+        # Samples after ``_committed``, the ones not transcribed yet.
+        self._audio = np.zeros(0, dtype=np.float32)
+        self._committed = 0
+        self._lock = threading.Lock()
+
+    def _decode_chunk(self, chunk: bytes) -> None:
+        if self.audio_format == "pcm":
+            seconds = (self.received + len(chunk)) / (2 * self.channels * self.sample_rate)
+            if self.max_seconds is not None and seconds > self.max_seconds:
+                raise AudioTooLongError(f"Audio is longer than the {self.max_seconds:.0f}s limit")
+            self._raw.extend(chunk)
+            usable = len(self._raw) - len(self._raw) % (2 * self.channels)
+            samples = decode_pcm(self._raw[:usable], self.sample_rate, self.channels)
+            del self._raw[:usable]
+            self._audio = np.concatenate((self._audio, samples))
+            return
+        if self._too_long:
+            raise AudioTooLongError(f"Audio is longer than the {self.max_seconds:.0f}s limit")
+        if self._decoder is None:
+            self._decoder = StreamDecoder(self.max_seconds)
+        self._decoder.feed(chunk)
+        self._append(self._decoder.take())
+
+    def _append(self, samples: np.ndarray) -> None:
+        """Add decoded container samples, cutting the stream at ``max_seconds``."""
+        if self.max_seconds is not None:
+            room = int(self.max_seconds * SAMPLE_RATE) - self._committed - len(self._audio)
+            if len(samples) > room:
+                self._audio = np.concatenate((self._audio, samples[:max(0, room)]))
+                self._too_long = True
+                raise AudioTooLongError(f"Audio is longer than the {self.max_seconds:.0f}s limit")
+        self._audio = np.concatenate((self._audio, samples))
+
+    def _transcribe_segment(self, length: int) -> dict:
+        result = self._transcriber(self._audio[:length])
+        end = self._committed + length
+        partial = {
+            "index": len(self.partials),
+            "text": (result.get("text") or "").strip(),
+            "language": result.get("language", "unknown"),
+            "start": round(self._committed / SAMPLE_RATE, 2),
+            "end": round(end / SAMPLE_RATE, 2),
+        }
+        self._committed = end
+        self._audio = self._audio[length:]
+        self.partials.append(partial)
+        return partial
+
+    def add_chunk(self, chunk: bytes) -> list[dict]:
+        """Append a chunk and return the partial transcripts it completed.
+
+        Raises ``UploadTooLargeError`` or ``AudioTooLongError`` for a chunk
+        that would take the session past its limits.
+        """
+        with self._lock:
+            self.last_activity = time.monotonic()
+            if self.received + len(chunk) > self.max_bytes:
+                raise UploadTooLargeError(f"Stream is larger than the {self.max_bytes // 2**20} MB limit")
+            self._decode_chunk(chunk)
+            self.received += len(chunk)
+
+            emitted = []
+            while True:
+                pending = self._audio
+                if len(pending) >= MAX_CHUNK:
+                    cut = last_pause(pending[:MAX_CHUNK]) or MAX_CHUNK
+                else:
+                    cut = last_pause(pending)
+                if cut is None:
+                    break
+                emitted.append(self._transcribe_segment(cut))
+            return emitted
+
+    def finish(self) -> dict:
+        """Transcribe the remaining audio and return the full transcript."""
+        with self._lock:
+            self.last_activity = time.monotonic()
+            if self._decoder is not None:
+                decoder, self._decoder = self._decoder, None
+                try:
+                    self._append(decoder.close(timeout_s=FINISH_DECODE_TIMEOUT_S))
+                except AudioTooLongError:
+                    pass  # the tail past the limit was dropped
+            if len(self._audio) >= FRAME:
+                self._transcribe_segment(len(self._audio))
+
+            texts = [p["text"] for p in self.partials if p["text"]]
+            languages = Counter(p["language"] for p in self.partials if p["text"])
+            language = languages.most_common(1)[0][0] if languages else "unknown"
+            return {
+                "text": " ".join(texts),
+                "language": language,
+                "partials": list(self.partials),
+            }
+
+    def close(self) -> None:
+        """Stop the session's ffmpeg process, if any."""
+        with self._lock:
+            if self._decoder is not None:
+                self._decoder.kill()
+                self._decoder = None
+
+
+class StreamingSessionStore:
+    """Thread-safe registry of open sessions with idle expiry."""
+
+    def __init__(self, idle_timeout_s: float = 120.0) -> None:
+        self.idle_timeout_s = idle_timeout_s
+        self._sessions: dict[str, StreamingSession] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout_s
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_activity < cutoff]:
+            self._sessions.pop(session_id).close()
+
+    def add(self, session: StreamingSession) -> StreamingSession:
+        with self._lock:
+            self._expire()
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[StreamingSession]:
+        with self._lock:
+            self._expire()
+            return self._sessions.get(session_id)
+
+    def pop(self, session_id: str) -> Optional[StreamingSession]:
+        with self._lock:
+            return self._sessions.pop(session_id, None)
@@ -0,0 +1,124 @@
+"""Energy-based voice-activity detection for 16 kHz mono float32 audio.
+
+Frames are 20 ms long. A frame counts as speech when its RMS exceeds an
+adaptive threshold: a multiple of the clip's noise floor, but never below
+an absolute minimum. Speech regions are padded slightly and merged across
+short gaps, so word boundaries and brief breaths are not clipped.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from services.audio_decode import SAMPLE_RATE
+
+FRAME = SAMPLE_RATE // 50              # 20 ms
+MIN_RMS = 0.001                        # absolute floor (-60 dBFS)
+MAX_THRESHOLD = 0.05                   # cap so speech-only clips are not rejected
+NOISE_FLOOR_RATIO = 3.0                # speech must be 3x the quietest frames
+PAD = int(0.2 * SAMPLE_RATE)           # keep 200 ms around speech
+MERGE_GAP = int(0.3 * SAMPLE_RATE)     # join regions closer than 300 ms
+MIN_SPEECH = int(0.15 * SAMPLE_RATE)   # ignore clicks shorter than 150 ms
+MAX_CHUNK = 30 * SAMPLE_RATE           # one Whisper window
+
+
+def frame_rms(audio: np.ndarray) -> np.ndarray:
+    n_frames = len(audio) // FRAME
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n_frames * FRAME].reshape(n_frames, FRAME)
+    return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+
+def _speech_mask(rms: np.ndarray) -> np.ndarray:
+    if rms.size == 0:
+        return np.zeros(0, dtype=bool)
+    noise_floor = float(np.percentile(rms, 10))
+    threshold = max(MIN_RMS, min(noise_floor * NOISE_FLOOR_RATIO, MAX_THRESHOLD))
+    return rms >= threshold
+
+
+def speech_regions(audio: np.ndarray) -> list[tuple[int, int]]:
+    """Return ``(start, end)`` sample ranges that contain speech."""
+    mask = _speech_mask(frame_rms(audio))
+    regions: list[tuple[int, int]] = []
+    start = None
+    for i, is_speech in enumerate(np.append(mask, False)):
+        if is_speech and start is None:
+            start = i
+        elif not is_speech and start is not None:
+            regions.append((start * FRAME, i * FRAME))
+            start = None
+
+    # [padded_start, padded_end, voiced_samples]
+    merged: list[list[int]] = []
+    for begin, end in regions:
+        voiced = end - begin
+        begin, end = max(0, begin - PAD), min(len(audio), end + PAD)
+        if merged and begin - merged[-1][1] <= MERGE_GAP:
+            merged[-1][1] = max(end, merged[-1][1])
+            merged[-1][2] += voiced
+        else:
+            merged.append([begin, end, voiced])
+    return [(begin, end) for begin, end, voiced in merged if voiced >= MIN_SPEECH]
+
+
+def has_speech(audio: np.ndarray) -> bool:
+    return bool(speech_regions(audio))
+
+
+def trim_silence(audio: np.ndarray) -> np.ndarray:
+    """Drop leading and trailing silence; empty when no speech is found."""
+    regions = speech_regions(audio)
+    if not regions:
+        return audio[:0]
+    return audio[regions[0][0]: regions[-1][1]]
+
+
+def split_on_pauses(audio: np.ndarray, max_len: int = MAX_CHUNK) -> list[np.ndarray]:
+    """Split speech into chunks of at most ``max_len`` samples, cutting at pauses.
+
+    Silence between chunks is discarded. A single region longer than
+    ``max_len`` with no pause in it is cut into fixed-size pieces.
+    """
+    chunks: list[np.ndarray] = []
+    current: Optional[tuple[int, int]] = None
+    for begin, end in speech_regions(audio):
+        if current is not None and end - current[0] <= max_len:
+            current = (current[0], end)
+            continue
+        if current is not None:
+            chunks.append(audio[current[0]: current[1]])
+        while end - begin > max_len:
+            chunks.append(audio[begin: begin + max_len])
+            begin += max_len
+        current = (begin, end)
+    if current is not None:
+        chunks.append(audio[current[0]: current[1]])
+    return chunks
+
+
+def last_pause(
+    audio: np.ndarray,
+    min_segment: int = 2 * SAMPLE_RATE,
+    min_pause: int = SAMPLE_RATE // 2,
+) -> Optional[int]:
+    """Return the sample index in the middle of the last pause of ``min_pause``.
+
+    Only pauses that start at least ``min_segment`` samples in are considered,
+    so callers never cut off a uselessly short segment.
+    """
+    mask = _speech_mask(frame_rms(audio))
+    min_pause_frames = max(1, min_pause // FRAME)
+    cut = None
+    run_start = None
+    for i, is_speech in enumerate(mask):
+        if not is_speech:
+            if run_start is None:
+                run_start = i
+            if i - run_start + 1 >= min_pause_frames and run_start * FRAME >= min_segment:
+                cut = (run_start + i + 1) // 2 * FRAME
+        else:
+            run_start = None
+    return cut
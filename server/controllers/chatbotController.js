@@ -1,6 +1,16 @@
 import fetch from 'node-fetch';
 import ChatMessage from '../models/ChatMessage.js';
 
+// Conversation memory in the chat service is keyed by this id. It is scoped
+// to the signed-in user (or marked anonymous) so a client-chosen session_id
+// can never reach another user's history. Anonymous requests without a
+// session_id stay stateless.
+function sessionIdFor(req) {
+  const explicit = typeof req.body?.session_id === 'string' ? req.body.session_id.trim().slice(0, 64) : '';
+  if (req.userId) return explicit ? `user:${req.userId}:${explicit}` : `user:${req.userId}`;
+  return explicit ? `anon:${explicit}` : undefined;
+}
+
 export async function getChatbotReply(req, res) {
   try {
     const { message } = req.body || {};
@@ -22,7 +32,7 @@ export async function getChatbotReply(req, res) {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ message: message.trim() }),
+        body: JSON.stringify({ message: message.trim(), session_id: sessionIdFor(req) }),
         signal: controller.signal,
       });
       clearTimeout(timeoutId);
@@ -86,6 +96,88 @@ export async function getChatbotReply(req, res) {
   }
 }
 
+async function persistExchange(userId, message, reply) {
+  if (!userId) return;
+  try {
+    const userMood = inferMoodFromText(message);
+    await ChatMessage.create({ userId, role: 'user', content: message.trim(), mood: userMood });
+    await ChatMessage.create({ userId, role: 'assistant', content: reply, mood: 'neutral' });
+  } catch (persistErr) {
+    console.error('Failed to persist chat messages (stream):', persistErr?.message);
+  }
+}
+
+// POST /api/chatbot/reply/stream: relay Flask's /chat/stream events (SSE, or
+// NDJSON with ?format=ndjson) as they arrive. The exchange is persisted from
+// the final "done" event.
+export async function streamChatbotReply(req, res) {
+  const { message } = req.body || {};
+  if (!message || typeof message !== 'string' || !message.trim()) {
+    return res.status(400).json({ error: 'Message is required and must be a non-empty string' });
+  }
+
+  const ndjson = req.query.format === 'ndjson' || (req.get('accept') || '').includes('application/x-ndjson');
+  const format = ndjson ? 'ndjson' : 'sse';
+  const flaskUrl = process.env.FLASK_CHATBOT_URL || 'http://localhost:5001';
+  const controller = new AbortController();
+  const timeoutId = setTimeout(() => controller.abort(), 30000);
+  req.on('close', () => controller.abort());
+
+  const encode = (event, data) => (ndjson
+    ? `${JSON.stringify({ event, ...data })}\n`
+    : `event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+
+  res.status(200).set({
+    'Content-Type': ndjson ? 'application/x-ndjson' : 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+  });
+  res.flushHeaders();
+
+  let buffer = '';
+  let reply = null;
+  try {
+    const flaskResponse = await fetch(`${flaskUrl}/chat/stream?format=${format}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ message: message.trim(), session_id: sessionIdFor(req) }),
+      signal: controller.signal,
+    });
+    if (!flaskResponse.ok) {
+      throw new Error(`Flask service returned ${flaskResponse.status}`);
+    }
+    for await (const chunk of flaskResponse.body) {
+      res.write(chunk);
+      // Watch for the "done" event so the final reply can be stored.
+      buffer += chunk.toString('utf8');
+      const marker = ndjson ? '"event": "done"' : 'event: done\ndata: ';
+      const at = buffer.indexOf(marker);
+      if (at !== -1) {
+        const tail = buffer.slice(ndjson ? buffer.lastIndexOf('\n', at) + 1 : at + marker.length);
+        const line = tail.split('\n')[0];
+        try {
+          reply = JSON.parse(line).reply;
+        } catch {
+          // Event split across chunks; try again on the next one.
+        }
+      } else if (buffer.length > 8192) {
+        buffer = buffer.slice(-1024);
+      }
+    }
+  } catch (flaskError) {
+    console.error('Flask stream unavailable:', flaskError.name === 'AbortError' ? 'timeout' : flaskError.message);
+    if (reply === null) {
+      reply = getFallbackReply(message);
+      res.write(encode('fallback', { text: reply, discard_partial: buffer.length > 0 }));
+      res.write(encode('done', { source: 'node_fallback', reply, ttft_ms: null, total_ms: null }));
+    }
+  } finally {
+    clearTimeout(timeoutId);
+  }
+  res.end();
+  if (reply) await persistExchange(req.userId, message, reply);
+}
+
 function getFallbackReply(userText) {
   const lowered = userText.toLowerCase();
   
@@ -1,10 +1,11 @@
 import express from 'express';
-import { getChatbotReply, getChatHistory, getChatAnalytics } from '../controllers/chatbotController.js';
+import { getChatbotReply, streamChatbotReply, getChatHistory, getChatAnalytics } from '../controllers/chatbotController.js';
 import { requireAuth, tryAuth } from '../middleware/auth.js';
 
 const router = express.Router();
 
 router.post('/reply', tryAuth, getChatbotReply);
+router.post('/reply/stream', tryAuth, streamChatbotReply);
 router.get('/history', requireAuth, getChatHistory);
 router.get('/analytics', requireAuth, getChatAnalytics);
 
@@ -5,6 +5,7 @@ import dotenv from 'dotenv';
 import path from 'path';
 import { fileURLToPath } from 'url';
 import fetch from 'node-fetch';
+import multer from 'multer';
 import connectDB from './config/db.js';
 import { requireAuth } from './middleware/auth.js';
 
@@ -50,19 +51,53 @@ app.use('/api/v1/calendar', calendarRoutes);
 app.use('/api/planner', plannerRoutes);
 app.use('/api/therapists', therapistRoutes);
 
-app.post('/api/voice/process', requireAuth, async (req, res) => {
+// Voice uploads: multipart (field "audio") or a raw binary body, capped like
+// the voice service (VOICE_MAX_UPLOAD_MB). JSON with audioBase64 still works.
+const VOICE_MAX_UPLOAD_BYTES = Number(process.env.VOICE_MAX_UPLOAD_MB || 25) * 1024 * 1024;
+const voiceMultipart = multer({
+  storage: multer.memoryStorage(),
+  limits: { fileSize: VOICE_MAX_UPLOAD_BYTES, files: 1 },
+}).single('audio');
+const voiceRawBody = express.raw({
+  type: ['audio/*', 'video/webm', 'application/octet-stream'],
+  limit: VOICE_MAX_UPLOAD_BYTES,
+});
+
+function parseVoiceUpload(req, res, next) {
+  const parser = req.is('multipart/form-data') ? voiceMultipart : voiceRawBody;
+  parser(req, res, (err) => {
+    if (!err) return next();
+    const tooLarge = err.code === 'LIMIT_FILE_SIZE' || err.status === 413;
+    return res.status(tooLarge ? 413 : 400).json({ error: err.message || 'Invalid audio upload' });
+  });
+}
+
+app.post('/api/voice/process', requireAuth, parseVoiceUpload, async (req, res) => {
   try {
-    const { audioBase64, mimeType } = req.body || {};
     const userId = req.userId || 'unknown';
-    if (!audioBase64 || typeof audioBase64 !== 'string') {
-      return res.status(400).json({ error: 'audioBase64 is required' });
-    }
+    const isRawBody = Buffer.isBuffer(req.body);
+    const fields = isRawBody ? {} : req.body || {};
+    const languageHint = fields.language ?? req.query.language ?? req.get('X-Language');
 
     let audioBuffer;
-    try {
-      audioBuffer = Buffer.from(audioBase64, 'base64');
-    } catch {
-      return res.status(400).json({ error: 'Invalid base64 audio payload' });
+    let mimeType;
+    if (req.file) {
+      audioBuffer = req.file.buffer;
+      mimeType = req.file.mimetype;
+    } else if (isRawBody) {
+      audioBuffer = req.body;
+      mimeType = req.get('Content-Type');
+    } else {
+      const { audioBase64 } = fields;
+      mimeType = fields.mimeType;
+      if (!audioBase64 || typeof audioBase64 !== 'string') {
+        return res.status(400).json({ error: 'audioBase64 is required' });
+      }
+      try {
+        audioBuffer = Buffer.from(audioBase64, 'base64');
+      } catch {
+        return res.status(400).json({ error: 'Invalid base64 audio payload' });
+      }
     }
     if (!audioBuffer?.length) {
       return res.status(400).json({ error: 'Decoded audio is empty' });
@@ -75,10 +110,16 @@ app.post('/api/voice/process', requireAuth, async (req, res) => {
       method: 'POST',
       headers: {
         'Content-Type': typeof mimeType === 'string' && mimeType.trim() ? mimeType : 'application/octet-stream',
+        'X-Session-Id': String(userId),
+        ...(typeof languageHint === 'string' && languageHint.trim() ? { 'X-Language': languageHint.trim() } : {}),
       },
       body: audioBuffer,
     });
 
+    if (voiceResp.status === 413 || voiceResp.status === 415) {
+      const errData = await voiceResp.json().catch(() => ({}));
+      return res.status(voiceResp.status).json({ error: errData.error || voiceResp.statusText });
+    }
     if (!voiceResp.ok) {
       const errText = await voiceResp.text().catch(() => '');
       return res.status(502).json({ error: `Voice model failed: ${errText || voiceResp.statusText}` });